@@ -0,0 +1,125 @@
+"""Benchmark of module lifecycle on synthetic landscapes
+
+Times ``initialize``, ``_build_cicd``, ``merge_stage``, ``copy_dir`` and ``_config_replace`` and writes the
+result as JSON to compare releases.
+
+Usage:
+    python benchmarks/bench_lifecycle.py --modules 5 --files 50 --envs 3 --steps 20 --output result.json
+    python benchmarks/bench_lifecycle.py --compare result.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# Runnable from a source checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import xia_module  # noqa: E402
+from xia_module.cicd.github import GitHubWorkflow  # noqa: E402
+from landscape import make_package, make_app, make_config_lines  # noqa: E402
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    durations = []
+    for _ in range(repeat):
+        context = setup() if setup else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            func(context)
+            durations.append(time.perf_counter() - start_time)
+    return {"mean": statistics.mean(durations), "min": min(durations), "max": max(durations), "runs": repeat}
+
+
+def run(params: argparse.Namespace, work_dir: str) -> dict:
+    stages = [f"stage-{i}" for i in range(params.stages)]
+    package = make_package(work_dir, "bench_modules", params.modules, params.files, stages, params.steps)
+    module_classes = [getattr(package, class_name) for class_name in package.modules.values()]
+    counter = iter(range(1_000_000))
+    cwd = os.getcwd()
+
+    def new_app():
+        app_dir = make_app(os.path.join(work_dir, f"app-{next(counter)}"), params.envs, stages)
+        os.chdir(app_dir)
+        return app_dir
+
+    results = {}
+    try:
+        results["initialize"] = measure(
+            lambda _: [module_class().initialize(app_name="bench") for module_class in module_classes],
+            params.repeat, new_app)
+        results["_build_cicd"] = measure(
+            lambda _: [module_class()._build_cicd() for module_class in module_classes], params.repeat, new_app)
+        results["copy_dir"] = measure(
+            lambda app_dir: module_classes[0].copy_dir(module_classes[0]().init_dir, app_dir),
+            params.repeat, new_app)
+
+        def config_setup():
+            app_dir = new_app()
+            with open(os.path.join(app_dir, "config.yaml"), "w") as fp:
+                fp.writelines(make_config_lines(params.config_keys))
+            return os.path.join(app_dir, "config.yaml")
+        replace_dict = {f"key_{i}:": f"key_{i}: value_{i}\n" for i in range(0, params.config_keys, 2)}
+        results["_config_replace"] = measure(
+            lambda file_path: xia_module.Module._config_replace(file_path, replace_dict), params.repeat, config_setup)
+
+        def merge_setup():
+            env_params = {"stages": stages}
+            target = GitHubWorkflow(os.path.join(work_dir, "merge.yml"), "", "dev", env_params)
+            return target, [GitHubWorkflow(os.path.join(module_class().cicd_dir, "github", "workflow.yml"))
+                            for module_class in module_classes]
+        results["merge_stage"] = measure(
+            lambda context: [context[0].merge_stage(stage_name, workflow)
+                             for workflow in context[1] for stage_name in stages], params.repeat, merge_setup)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def compare(current: dict, baseline: dict):
+    for name, result in current["results"].items():
+        if name in baseline.get("results", {}):
+            ratio = result["mean"] / baseline["results"][name]["mean"]
+            print(f"{name:>16}: {result['mean'] * 1000:9.2f} ms vs {baseline['results'][name]['mean'] * 1000:9.2f} ms"
+                  f" ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Module lifecycle benchmark")
+    parser.add_argument("--modules", type=int, default=3, help="number of modules")
+    parser.add_argument("--files", type=int, default=20, help="files of init and template directories per module")
+    parser.add_argument("--envs", type=int, default=3, help="environments in landscape.yaml")
+    parser.add_argument("--stages", type=int, default=5, help="stages per workflow")
+    parser.add_argument("--steps", type=int, default=5, help="steps per stage")
+    parser.add_argument("--config-keys", type=int, default=200, help="commented keys in config file")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each measure")
+    parser.add_argument("--output", default="", help="JSON result file")
+    parser.add_argument("--compare", default="", help="JSON result file of a previous run to compare with")
+    params = parser.parse_args()
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run(params, work_dir)
+    report = {
+        "meta": {"version": xia_module.__version__, "python": platform.python_version(),
+                 "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "params": {key: value for key, value in vars(params).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+    if params.output:
+        with open(params.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+    if params.compare:
+        with open(params.compare) as fp:
+            compare(report, json.load(fp))
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
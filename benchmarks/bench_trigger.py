@@ -0,0 +1,43 @@
+"""Benchmark of trigger compilation of landscape environments
+
+Usage:
+    python benchmarks/bench_trigger.py [environments] [repeat]
+"""
+import os
+import sys
+import timeit
+
+# Runnable from a source checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xia_module.cicd.trigger import TriggerCompiler  # noqa: E402
+
+PATTERNS = [
+    ".*",
+    "refs/heads/.*",
+    "refs/tags/.*",
+    "refs/heads/(main|develop|release/.*)",
+    r"^refs/(heads/feature/[^/]+|tags/v\d+\.\d+\.\d+)$",
+]
+
+
+def make_environments(count: int) -> dict:
+    return {f"env-{i}": {"match_branch": PATTERNS[i % len(PATTERNS)]} for i in range(count)}
+
+
+def main(environments: int = 50, repeat: int = 1000):
+    landscape = make_environments(environments)
+    print(f"{environments} environments, {repeat} runs")
+    candidates = {
+        "uncached": lambda: [TriggerCompiler._compile_pattern.__wrapped__(TriggerCompiler, env["match_branch"])
+                             for env in landscape.values()],
+        "per-pattern": lambda: [TriggerCompiler.compile_pattern(env["match_branch"]) for env in landscape.values()],
+        "per-landscape": lambda: TriggerCompiler.compile_landscape(landscape),
+    }
+    for name, func in candidates.items():
+        duration = min(timeit.repeat(func, number=repeat, repeat=3))
+        print(f"{name:>14}: {duration / repeat * 1000:.3f} ms per landscape")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
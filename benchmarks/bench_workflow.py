@@ -0,0 +1,61 @@
+"""Micro benchmark of new workflow creation
+
+Compare the in-memory workflow builder with the legacy dump-and-reload creation
+
+Usage:
+    python benchmarks/bench_workflow.py [repeat]
+"""
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+# Runnable from a source checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xia_module.cicd.github import GitHubWorkflow  # noqa: E402
+
+ENV_PARAMS = {
+    "match_branch": "refs/heads/(develop|main)",
+    "stages": ["test-local", "build", "deploy", "test-remote", "publish"]
+}
+
+
+def legacy_create(filename: str):
+    """Creation of a workflow with 4 round-trips: StringIO dump / load then file dump / load"""
+    if os.path.exists(filename):
+        os.remove(filename)
+    workflow = GitHubWorkflow(filename, "", "dev", ENV_PARAMS)
+    buffer = io.StringIO()
+    workflow.yaml.dump(workflow.data, buffer)
+    buffer.seek(0)
+    workflow.data = workflow.yaml.load(buffer)
+    workflow.dump()
+    with open(filename) as fp:
+        workflow.data = workflow.yaml.load(fp)
+    return workflow
+
+
+def in_memory_create(filename: str):
+    """Creation of a workflow directly in memory, only dumped once"""
+    if os.path.exists(filename):
+        os.remove(filename)
+    workflow = GitHubWorkflow(filename, "", "dev", ENV_PARAMS)
+    workflow.dump()
+    return workflow
+
+
+def main(repeat: int = 200):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, "workflows", "workflow-dev.yml")
+        results = {}
+        for name, func in [("legacy", legacy_create), ("in_memory", in_memory_create)]:
+            results[name] = timeit.timeit(lambda: func(filename), number=repeat) / repeat
+        for name, duration in results.items():
+            print(f"{name:>10}: {duration * 1000:.3f} ms per workflow")
+        print(f"   speedup: {results['legacy'] / results['in_memory']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,52 @@
+"""Benchmark of YAML backends on large workflows
+
+Usage:
+    python benchmarks/bench_yaml.py [stages] [steps_per_stage]
+"""
+import io
+import os
+import sys
+import timeit
+import yaml
+
+# Runnable from a source checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xia_module.yaml_backend import get_backend, HAS_LIBYAML  # noqa: E402
+
+
+def make_workflow(stages: int, steps_per_stage: int) -> str:
+    jobs = {}
+    for i in range(stages):
+        jobs[f"stage-{i}"] = {
+            "runs-on": "ubuntu-latest",
+            "permissions": {"contents": "read", "id-token": "write"},
+            "steps": [{
+                "id": f"step-{i}-{j}",
+                "name": f"Step {j} of stage {i}",
+                "uses": "./.github/actions/iac",
+                "with": {"env_name": "${{ vars.ENV_NAME }}", "project_id": "${{ vars.PROJECT_ID }}"},
+            } for j in range(steps_per_stage)]
+        }
+    return yaml.safe_dump({"name": "Workflow - dev", "on": {"push": {"branches": ["main"]}}, "jobs": jobs},
+                          sort_keys=False)
+
+
+def main(stages: int = 20, steps_per_stage: int = 50):
+    content = make_workflow(stages, steps_per_stage)
+    print(f"Workflow of {len(content) / 1024:.0f} KB, libyaml available: {HAS_LIBYAML}")
+    candidates = {
+        "fast": get_backend("fast").load,
+        "pure-safe": lambda stream: yaml.load(stream, Loader=yaml.SafeLoader),
+        "roundtrip": get_backend("roundtrip").load,
+    }
+    results = {}
+    for name, load in candidates.items():
+        repeat = 3
+        results[name] = timeit.timeit(lambda: load(io.StringIO(content)), number=repeat) / repeat
+        print(f"{name:>10}: {results[name] * 1000:.1f} ms per load")
+    print(f"   speedup of fast over roundtrip: {results['roundtrip'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,108 @@
+"""Synthetic landscapes for benchmarks
+
+A synthetic landscape is made of a generated module package (one ``Module`` subclass per module with init, config,
+template and cicd directories) and an application git repository with ``config/landscape.yaml``.
+"""
+import importlib
+import os
+import subprocess
+import sys
+import yaml
+
+
+def make_workflow(stages: list, steps_per_stage: int, prefix: str) -> dict:
+    jobs = {}
+    for stage_name in stages:
+        jobs[stage_name] = {
+            "runs-on": "ubuntu-latest",
+            "permissions": {"contents": "read", "id-token": "write"},
+            "steps": [{"id": "checkout-code", "uses": "actions/checkout@v4"}] + [{
+                "id": f"{prefix}-{stage_name}-{i}",
+                "name": f"{prefix} {stage_name} step {i}",
+                "uses": f"./.github/actions/{prefix}",
+                "with": {"env_name": "${{ vars.ENV_NAME }}"},
+            } for i in range(steps_per_stage)]
+        }
+    return {"name": f"Workflow of {prefix}", "on": {"push": {"branches": ["main"]}}, "jobs": jobs}
+
+
+def make_config_lines(keys: int) -> list:
+    lines = []
+    for i in range(keys):
+        lines.append(f"# Description of key_{i}\n")
+        lines.append(f"# key_{i}: default_{i}\n")
+    return lines
+
+
+def make_package(root: str, package_name: str, modules: int = 3, files: int = 20, stages: list = None,
+                 steps_per_stage: int = 5, config_keys: int = 50):
+    """Generate an importable module package
+
+    Args:
+        root (str): directory to be added into ``sys.path``
+        package_name (str): python package name
+        modules (int): number of modules
+        files (int): number of files in init and template directories of each module
+        stages (list): stages of each module workflow
+        steps_per_stage (int): steps of each stage
+        config_keys (int): commented keys in config file of each module
+
+    Returns:
+        imported package
+    """
+    stages = stages or ["test-local", "build", "deploy", "test-remote", "publish"]
+    package_dir = os.path.join(root, package_name)
+    class_lines, module_names = ["from xia_module import Module\n"], {}
+    for i in range(modules):
+        module_name = f"{package_name.replace('_', '-')}-{i}"
+        class_name = f"Module{i}"
+        depends = [f"{package_name.replace('_', '-')}-{i - 1}"] if i > 0 else []
+        class_lines.append(f"\n\nclass {class_name}(Module):\n    module_name = {module_name!r}\n"
+                           f"    activate_depends = {depends!r}\n    deploy_depends = {depends!r}\n")
+        module_names[module_name] = class_name
+        template_root = os.path.join(package_dir, "templates", module_name)
+        for j in range(files):
+            sub_dir = f"dir-{j % 5}"
+            # Init and template files have distinct targets, rendering doesn't overwrite copied init files
+            for dir_name, content in [("init", f"init file {j}\n"), ("template", f"{{{{ app_name }}}} {j}\n")]:
+                os.makedirs(os.path.join(template_root, dir_name, sub_dir), exist_ok=True)
+                with open(os.path.join(template_root, dir_name, sub_dir, f"{module_name}-{dir_name}-{j}.txt"),
+                          "w") as fp:
+                    fp.write(content)
+        os.makedirs(os.path.join(template_root, "config"), exist_ok=True)
+        with open(os.path.join(template_root, "config", f"{module_name}.yaml"), "w") as fp:
+            fp.writelines(make_config_lines(config_keys))
+        os.makedirs(os.path.join(template_root, "cicd", "github", "actions"), exist_ok=True)
+        with open(os.path.join(template_root, "cicd", "github", "actions", "action.yml"), "w") as fp:
+            yaml.safe_dump({"name": module_name, "runs": {"using": "composite", "steps": []}}, fp)
+        with open(os.path.join(template_root, "cicd", "github", "workflow.yml"), "w") as fp:
+            yaml.safe_dump(make_workflow(stages, steps_per_stage, module_name), fp, sort_keys=False)
+    with open(os.path.join(package_dir, "__init__.py"), "w") as fp:
+        fp.writelines(class_lines)
+        fp.write(f"\n\nmodules = {module_names!r}\n")
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    importlib.invalidate_caches()
+    return importlib.import_module(package_name)
+
+
+def make_app(root: str, environments: int = 3, stages: list = None) -> str:
+    """Generate an application git repository with a landscape file
+
+    Args:
+        root (str): application directory
+        environments (int): number of environments
+        stages (list): stages of each environment
+
+    Returns:
+        application directory
+    """
+    stages = stages or ["test-local", "build", "deploy", "test-remote", "publish"]
+    os.makedirs(os.path.join(root, "config"), exist_ok=True)
+    subprocess.run(["git", "init", "-q", root], check=True)
+    landscape = {"cicd": "github", "environments": {
+        f"env-{i}": {"match_branch": f"refs/heads/(env-{i}|main)", "stages": stages} for i in range(environments)
+    }}
+    with open(os.path.join(root, "config", "landscape.yaml"), "w") as fp:
+        yaml.safe_dump(landscape, fp, sort_keys=False)
+    return root
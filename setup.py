@@ -73,5 +73,8 @@ setuptools.setup(
             package_data_files,
     },
     install_requires=requirements,
+    entry_points={
+        "xia.modules": [f"{project_name} = {package_name}"],
+    },
     python_requires='>=3.9',
 )
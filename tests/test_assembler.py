@@ -0,0 +1,89 @@
+import os
+import shutil
+
+from xia_module import Module
+from xia_module.cicd.assembler import WorkflowAssembler
+from xia_module.cicd.github import GitHubWorkflow
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class FakeModule(Module):
+    def __init__(self, workflow_file: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cicd_dir = os.path.dirname(os.path.dirname(workflow_file))
+
+
+def prepare_module(tmp_path, module_name: str, source_file: str):
+    workflow_file = tmp_path / module_name / "cicd" / "github" / "workflow.yml"
+    workflow_file.parent.mkdir(parents=True)
+    shutil.copy(os.path.join(DATA_DIR, source_file), workflow_file)
+    return FakeModule(str(workflow_file))
+
+
+def test_assemble_single_pass(tmp_path):
+    modules = [prepare_module(tmp_path, "m1", "workflow-1.yml"), prepare_module(tmp_path, "m2", "workflow-2.yml")]
+    landscape_config = {"environments": {
+        "dev": {"match_branch": "refs/heads/(develop|main)", "stages": ["build", "deploy"]},
+        "prd": {"match_branch": "refs/tags/.*", "stages": ["deploy"]},
+    }}
+    assembler = WorkflowAssembler(landscape_config, workflow_dir=str(tmp_path / "workflows"))
+    written_files = assembler.assemble(modules)
+    assert written_files == [assembler.get_workflow_file("dev"), assembler.get_workflow_file("prd")]
+    for env_name in ["dev", "prd"]:
+        workflow = GitHubWorkflow(assembler.get_workflow_file(env_name))
+        step_names = [step.get("name", step.get("id")) for step in workflow.data["jobs"]["deploy"]["steps"]]
+        assert step_names == ["checkout-code", "Deploy Infrastructure", "Install Python", "Install dependencies",
+                              "Build Python package", "Publish release distributions to PyPI"]
+    # Assembling again doesn't duplicate steps with id
+    assembler.assemble(modules)
+    workflow = GitHubWorkflow(assembler.get_workflow_file("prd"))
+    assert [step.get("id") for step in workflow.data["jobs"]["deploy"]["steps"]].count("checkout-code") == 1
+
+
+def test_assemble_refresh(tmp_path):
+    modules = [prepare_module(tmp_path, "m1", "workflow-1.yml")]
+    landscape_config = {"environments": {"dev": {"match_branch": "refs/heads/main", "stages": ["deploy"]}}}
+    assembler = WorkflowAssembler(landscape_config, workflow_dir=str(tmp_path / "workflows"))
+    assembler.assemble(modules)
+    workflow = GitHubWorkflow(assembler.get_workflow_file("dev"))
+    workflow.data["jobs"]["deploy"]["steps"].append({"id": "local-step", "run": "echo local"})
+    workflow.dump()
+    landscape_config["environments"]["dev"]["match_branch"] = "refs/heads/develop"
+    # Without refresh, only steps are merged
+    assembler.assemble(modules)
+    assert GitHubWorkflow(assembler.get_workflow_file("dev")).data["on"]["push"]["branches"] == ["main"]
+    landscape_config["environments"]["dev"]["stages"] = ["build", "deploy"]
+    assembler.assemble(modules, refresh=True)
+    workflow = GitHubWorkflow(assembler.get_workflow_file("dev"))
+    assert workflow.data["on"]["push"]["branches"] == ["develop"]
+    assert list(workflow.data["jobs"]) == ["build", "deploy"]
+    assert workflow.data["jobs"]["deploy"]["needs"] == "build"
+    assert workflow.data["jobs"]["deploy"]["steps"][-1]["id"] == "local-step"
+    # Without local change, a refreshed workflow is the same as a new one
+    fresh_assembler = WorkflowAssembler(landscape_config, workflow_dir=str(tmp_path / "fresh"))
+    fresh_assembler.assemble(modules)
+    workflow.data["jobs"]["deploy"]["steps"].pop()
+    workflow.dump()
+    assembler.assemble(modules, refresh=True)
+    with open(assembler.get_workflow_file("dev")) as fp, open(fresh_assembler.get_workflow_file("dev")) as fresh_fp:
+        assert fp.read() == fresh_fp.read()
+
+
+def test_assemble_refresh_keeps_job_settings(tmp_path):
+    modules = [prepare_module(tmp_path, "m1", "workflow-1.yml")]
+    landscape_config = {"environments": {"dev": {"match_branch": "refs/heads/main", "stages": ["deploy"]}}}
+    assembler = WorkflowAssembler(landscape_config, workflow_dir=str(tmp_path / "workflows"))
+    assembler.assemble(modules)
+    workflow = GitHubWorkflow(assembler.get_workflow_file("dev"))
+    workflow.data["jobs"]["deploy"]["if"] = False
+    workflow.data["jobs"]["deploy"]["runs-on"] = "self-hosted"
+    workflow.dump()
+    landscape_config["environments"]["dev"] = {"match_branch": "refs/heads/develop", "stages": ["build", "deploy"]}
+    assembler.assemble(modules, refresh=True)
+    workflow = GitHubWorkflow(assembler.get_workflow_file("dev"))
+    assert workflow.data["on"]["push"]["branches"] == ["develop"]
+    assert workflow.data["jobs"]["deploy"]["if"] is False
+    assert workflow.data["jobs"]["deploy"]["runs-on"] == "self-hosted"
+    assert workflow.data["jobs"]["deploy"]["needs"] == "build"
+    assert workflow.data["jobs"]["build"]["runs-on"] == "ubuntu-latest"
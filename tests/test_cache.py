@@ -0,0 +1,27 @@
+import os
+
+import yaml
+from xia_module.cache import ParseCache
+
+
+def test_parse_cache(tmp_path):
+    cache = ParseCache(max_size=1)
+    filename = str(tmp_path / "landscape.yaml")
+    with open(filename, "w") as fp:
+        fp.write("environments:\n  dev:\n    stages: [build, deploy]\n")
+    data = cache.load(filename, yaml.safe_load)
+    data["environments"]["dev"]["stages"].pop()
+    assert cache.load(filename, yaml.safe_load)["environments"]["dev"]["stages"] == ["build", "deploy"]
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+    # Modified file is parsed again
+    with open(filename, "w") as fp:
+        fp.write("environments: {}\n")
+    os.utime(filename, ns=(0, 0))
+    assert cache.load(filename, yaml.safe_load) == {"environments": {}}
+    assert cache.stats()["misses"] == 2
+    # Least recently used entry is evicted
+    other_filename = str(tmp_path / "other.yaml")
+    with open(other_filename, "w") as fp:
+        fp.write("a: 1\n")
+    cache.load(other_filename, yaml.safe_load)
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,31 @@
+import os
+
+from xia_module import Module
+
+
+def test_config_replace(tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("# Comment\n#  key_1: a\n# key_10: b\nkey_1: c\n  # key_2: d\n")
+    replace_dict = {"key_1": "key_1: new\n", "key_10": "key_10: never\n", "key_2:": "key_2: new\n"}
+    assert Module._config_replace(str(config_file), replace_dict)
+    assert config_file.read_text() == "# Comment\nkey_1: new\nkey_1: new\nkey_1: c\nkey_2: new\n"
+    # No rule fired: file untouched
+    os.utime(config_file, ns=(0, 0))
+    assert not Module._config_replace(str(config_file), {"key_3": "key_3: new\n"})
+    assert os.stat(config_file).st_mtime_ns == 0
+    assert not Module._config_replace(str(tmp_path / "missing.yaml"), replace_dict)
+
+
+def test_config_replace_batch(tmp_path):
+    files = []
+    for i in range(5):
+        config_file = tmp_path / f"config-{i}.yaml"
+        config_file.write_text("# key_a: 1\n# key_b: 2\n")
+        files.append(str(config_file))
+    jobs = [(file_path, {"key_a": "key_a: x\n"}) for file_path in files]
+    jobs += [(files[0], {"key_b": "key_b: y\n"}), (files[1], {"key_c": "key_c: z\n"})]
+    result = Module.config_replace_batch(jobs, max_workers=3)
+    assert result == {file_path: True for file_path in files}
+    assert open(files[0]).read() == "key_a: x\nkey_b: y\n"
+    assert open(files[4]).read() == "key_a: x\n# key_b: 2\n"
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(file_path) for file_path in files)
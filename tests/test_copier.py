@@ -0,0 +1,77 @@
+import os
+
+import pytest
+from xia_module import Module
+
+
+@pytest.fixture
+def source_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source_dir = tmp_path / "source"
+    (source_dir / "sub").mkdir(parents=True)
+    (source_dir / "a.txt").write_text("a")
+    (source_dir / "sub" / "b.txt").write_text("b")
+    return source_dir
+
+
+def test_incremental_copy(source_dir):
+    result = Module.copy_dir(str(source_dir), "target", overwrite=True, incremental=True)
+    assert sorted(result.copied) == [os.path.join("target", "a.txt"), os.path.join("target", "sub", "b.txt")]
+    assert os.path.exists(Module.get_manifest_file())
+    result = Module.copy_dir(str(source_dir), "target", overwrite=True, incremental=True)
+    assert result.copied == [] and len(result.unchanged) == 2
+    (source_dir / "a.txt").write_text("new a")
+    result = Module.copy_dir(str(source_dir), "target", overwrite=True, incremental=True)
+    assert result.copied == [os.path.join("target", "a.txt")]
+    assert open(os.path.join("target", "a.txt")).read() == "new a"
+
+
+def test_hardlink_copy(source_dir):
+    result = Module.copy_dir(str(source_dir), "target", strategy="hardlink")
+    assert len(result.copied) == 2
+    assert os.path.samefile(source_dir / "a.txt", os.path.join("target", "a.txt"))
+    # Copy over a hardlink must not change the source file
+    (source_dir / "c.txt").write_text("c")
+    os.remove(os.path.join("target", "a.txt"))
+    os.link(source_dir / "c.txt", os.path.join("target", "a.txt"))
+    Module.copy_dir(str(source_dir), "target", overwrite=True)
+    assert (source_dir / "c.txt").read_text() == "c"
+    result = Module.copy_dir(str(source_dir), "target")
+    assert len(result.skipped) == 3
+
+
+def test_incremental_copy_without_overwrite(source_dir):
+    os.makedirs("target")
+    with open(os.path.join("target", "a.txt"), "w") as fp:
+        fp.write("local a")
+    result = Module.copy_dir(str(source_dir), "target", incremental=True)
+    assert result.copied == [os.path.join("target", "sub", "b.txt")]
+    assert result.skipped == [os.path.join("target", "a.txt")]
+    # Targets copied by a previous run follow their source
+    (source_dir / "sub" / "b.txt").write_text("new b")
+    result = Module.copy_dir(str(source_dir), "target", incremental=True)
+    assert result.copied == [os.path.join("target", "sub", "b.txt")]
+    assert open(os.path.join("target", "sub", "b.txt")).read() == "new b"
+    assert open(os.path.join("target", "a.txt")).read() == "local a"
+
+
+def test_copy_flat_dir_to_new_target(tmp_path, monkeypatch):
+    # Flat directories (no sub directory) like action directories used to fail on a missing target
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "actions").mkdir()
+    (tmp_path / "actions" / "action.yml").write_text("name: action")
+    result = Module.copy_dir(str(tmp_path / "actions"), os.path.join(".github", "actions", "module"))
+    assert result.copied == [os.path.join(".github", "actions", "module", "action.yml")]
+
+
+def test_incremental_copy_keeps_edited_target(source_dir):
+    Module.copy_dir(str(source_dir), "target", incremental=True)
+    with open(os.path.join("target", "sub", "b.txt"), "w") as fp:
+        fp.write("local b")
+    (source_dir / "sub" / "b.txt").write_text("new b")
+    result = Module.copy_dir(str(source_dir), "target", incremental=True)
+    assert result.skipped == [os.path.join("target", "sub", "b.txt")]
+    assert open(os.path.join("target", "sub", "b.txt")).read() == "local b"
+    result = Module.copy_dir(str(source_dir), "target", overwrite=True, incremental=True)
+    assert result.copied == [os.path.join("target", "sub", "b.txt")]
+    assert open(os.path.join("target", "sub", "b.txt")).read() == "new b"
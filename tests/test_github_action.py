@@ -24,3 +24,53 @@ def test_create():
     action_1.merge_stage("deploy", workflow_2)
     # print(action_1.data)
     action_1.dump()
+
+
+def test_create_in_memory():
+    filename = "./data/workflow-action-2.yml"
+    if os.path.exists(filename):
+        os.remove(filename)
+    action = GitHubWorkflow(filename, "", "dev", {"match_branch": "refs/heads/(develop|main)",
+                                                  "stages": ["local-test", "build", "deploy"]})
+    assert not os.path.exists(filename)
+    action.dump()
+    with open(filename) as fp:
+        content = fp.read()
+    assert "\n\njobs:\n  local-test:\n" in content
+    assert "\n\n  build:\n" in content
+    # Reloaded file keeps the same format
+    reloaded = GitHubWorkflow(filename)
+    reloaded.dump()
+    with open(filename) as fp:
+        assert fp.read() == content
+    os.remove(filename)
+
+
+def test_merge_workflow():
+    action = GitHubWorkflow("./data/workflow-action-3.yml", "", "base", {"stages": ["build", "deploy", "publish"]})
+    assert action.merge_workflow(GitHubWorkflow("./data/workflow-1.yml")) == 1
+    assert action.merge_workflow(GitHubWorkflow("./data/workflow-2.yml"), stages=["deploy"]) == 4
+    # Steps with existed id are not merged again, steps without id are always merged
+    assert action.merge_workflow(GitHubWorkflow("./data/workflow-1.yml")) == 1
+    step_ids = [step.get("id") for step in action.data["jobs"]["deploy"]["steps"]]
+    assert step_ids.count("checkout-code") == 1 and len(step_ids) == 7
+    assert not os.path.exists("./data/workflow-action-3.yml")
+
+
+def test_dump_unchanged():
+    filename = "./data/workflow-action-4.yml"
+    if os.path.exists(filename):
+        os.remove(filename)
+    action = GitHubWorkflow(filename, "", "dev", {"stages": ["build", "deploy"]})
+    assert action.dump()
+    assert not GitHubWorkflow(filename).dump()
+    # Formatting only changes are not written
+    with open(filename) as fp:
+        content = fp.read()
+    with open(filename, "w") as fp:
+        fp.write(content.replace("\n\n", "\n"))
+    assert not GitHubWorkflow(filename).dump()
+    action = GitHubWorkflow(filename)
+    action.merge_stage("deploy", GitHubWorkflow("./data/workflow-1.yml"))
+    assert action.dump()
+    os.remove(filename)
@@ -0,0 +1,124 @@
+import os
+import threading
+
+import pytest
+from xia_module import Module, ModuleOrchestrator
+
+
+class Base(Module):
+    events = []
+    lock = threading.Lock()
+
+    def enable(self, **kwargs):
+        with self.lock:
+            self.events.append(self.module_name)
+
+
+class Network(Base):
+    module_name = "network"
+
+
+class Project(Base):
+    module_name = "project"
+    activate_depends = ["network"]
+
+
+class Storage(Base):
+    module_name = "storage"
+    activate_depends = ["project", "network", "external"]
+
+
+class Cycle1(Base):
+    module_name = "cycle-1"
+    activate_depends = ["cycle-2"]
+
+
+class Cycle2(Base):
+    module_name = "cycle-2"
+    activate_depends = ["cycle-1"]
+
+
+def test_dependency_order():
+    Base.events.clear()
+    orchestrator = ModuleOrchestrator([Storage, Project, Network], max_workers=2)
+    assert orchestrator.get_levels() == [["network"], ["project"], ["storage"]]
+    timings = orchestrator.run("enable")
+    assert Base.events == ["network", "project", "storage"]
+    assert set(timings) == {"network", "project", "storage"}
+
+
+def test_cycle_detection():
+    orchestrator = ModuleOrchestrator([Network, Cycle1, Cycle2])
+    with pytest.raises(ValueError, match="cycle-1 -> cycle-2 -> cycle-1"):
+        orchestrator.run("enable")
+
+
+class TerraformModule(Module):
+    template_root = ""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.module_dir = os.path.join(self.template_root, self.module_name, "module")
+        self.activate_dir = os.path.join(self.template_root, self.module_name, "activate")
+        self.base_file = os.path.join(self.template_root, self.module_name, "base", "main.tf")
+        self.activate_file = os.path.join(self.template_root, self.module_name, "base", "activate.tf")
+
+
+def test_materialize(tmp_path, monkeypatch):
+    module_classes = []
+    for i in range(3):
+        module_name = f"tf-{i}"
+        for dir_name, file_name in [("module", "main.tf"), ("activate", "main.tf"), ("base", "main.tf"),
+                                    ("base", "activate.tf")]:
+            (tmp_path / "templates" / module_name / dir_name).mkdir(parents=True, exist_ok=True)
+            (tmp_path / "templates" / module_name / dir_name / file_name).write_text(
+                f"# {module_name} {dir_name} {file_name}\n")
+        module_classes.append(type(f"TfModule{i}", (TerraformModule, ), {
+            "module_name": module_name, "template_root": str(tmp_path / "templates")}))
+    app_dir = tmp_path / "app"
+    (app_dir / "iac" / "modules" / "tf-0").mkdir(parents=True)
+    (app_dir / "iac" / "modules" / "tf-0" / "main.tf").write_text("# local\n")
+    monkeypatch.chdir(app_dir)
+    timings = ModuleOrchestrator(module_classes, max_workers=3).materialize(strategy="hardlink")
+    assert sorted(timings) == ["tf-0", "tf-1", "tf-2"]
+    assert (app_dir / "iac" / "modules" / "tf-0" / "main.tf").read_text() == "# local\n"
+    assert os.path.samefile(app_dir / "iac" / "modules" / "tf-1" / "main.tf",
+                            tmp_path / "templates" / "tf-1" / "module" / "main.tf")
+    assert (app_dir / "iac" / "modules" / "activate-tf-2" / "main.tf").read_text() == "# tf-2 activate main.tf\n"
+    assert (app_dir / "iac" / "environments" / "base" / "activate_tf-2.tf").read_text() == \
+        "# tf-2 base activate.tf\n"
+    assert (app_dir / "iac" / "environments" / "base" / "tf-2.tf").read_text() == "# tf-2 base main.tf\n"
+
+
+class CicdModule(Module):
+    workflow_builds = []
+
+    def _build_config(self, **kwargs):
+        pass
+
+    @classmethod
+    def build_cicd_workflows(cls, modules: list, landscape_config: dict = None, refresh: bool = False,
+                             replace: bool = False):
+        cls.workflow_builds.append([module.module_name for module in modules])
+        return []
+
+
+class CicdNetwork(CicdModule):
+    module_name = "network"
+
+
+class CicdProject(CicdModule):
+    module_name = "project"
+    activate_depends = ["network"]
+
+
+def test_initialize_single_workflow_build(tmp_path, monkeypatch):
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "landscape.yaml").write_text("cicd: github\n")
+    monkeypatch.chdir(tmp_path)
+    CicdModule.workflow_builds.clear()
+    ModuleOrchestrator([CicdProject, CicdNetwork], max_workers=2).run("initialize")
+    assert CicdModule.workflow_builds == [["network", "project"]]
+    CicdModule.workflow_builds.clear()
+    CicdProject().initialize()
+    assert CicdModule.workflow_builds == [["project"]]
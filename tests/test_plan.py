@@ -0,0 +1,94 @@
+import os
+import subprocess
+import threading
+
+import pytest
+from xia_module import Module, ModuleOrchestrator
+from xia_module.plan import Plan
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class PlanModule(Module):
+    module_name = "plan-module"
+
+    def __init__(self, template_root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.init_dir = os.path.join(template_root, "init")
+        self.cicd_dir = os.path.join(template_root, "cicd")
+        self.config_dir = os.path.join(template_root, "config")
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    template_root = tmp_path / "templates"
+    (template_root / "init").mkdir(parents=True)
+    (template_root / "init" / "README.md").write_text("hello\n")
+    (template_root / "cicd" / "github").mkdir(parents=True)
+    with open(os.path.join(DATA_DIR, "workflow-1.yml")) as fp:
+        workflow = fp.read().replace("      - name: Deploy", "      - id: deploy\n        name: Deploy")
+    (template_root / "cicd" / "github" / "workflow.yml").write_text(workflow)
+    app_dir = tmp_path / "app"
+    (app_dir / "config").mkdir(parents=True)
+    (app_dir / "config" / "landscape.yaml").write_text("environments:\n  dev:\n    stages: [deploy]\n")
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    return PlanModule(str(template_root))
+
+
+def test_plan_and_apply(app_module):
+    plan = app_module.plan("initialize")
+    assert not os.path.exists("README.md")
+    assert not os.path.exists(os.path.join(".github", "workflows", "workflow-dev.yml"))
+    assert plan.summary() == {"copy": 1, "stage": 2, "write": 1}
+    assert "+++ b/README.md\n" in plan.diff() and "+hello\n" in plan.diff()
+    plan.apply()
+    assert open("README.md").read() == "hello\n"
+    staged = subprocess.run(["git", "diff", "--cached", "--name-only"], capture_output=True, text=True).stdout
+    assert sorted(staged.split()) == [".github/workflows/workflow-dev.yml", "README.md"]
+    # Nothing to do anymore
+    plan = app_module.plan("initialize")
+    assert plan.diff() == ""
+    assert "copy" not in plan.summary()
+
+
+def test_plan_reads_planned_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source").mkdir()
+    (tmp_path / "source" / "app.yaml").write_text("# key: default\nother: 1\n")
+    with Plan() as plan:
+        Module.copy_dir("source", "config")
+        Module._config_replace(os.path.join("config", "app.yaml"), {"never": "match"})
+        Module._config_replace(os.path.join("config", "app.yaml"), {"key:": "key: value\n"})
+    assert plan.summary() == {"copy": 1, "unchanged": 1, "write": 1}
+    assert plan.read_text(os.path.join("config", "app.yaml")) == "key: value\nother: 1\n"
+    assert not os.path.exists("config")
+
+
+def test_orchestrator_plan(app_module, tmp_path):
+    orchestrator = ModuleOrchestrator([PlanModule], max_workers=2)
+    plan = orchestrator.plan("initialize", init_kwargs={"template_root": str(tmp_path / "templates")})
+    assert not os.path.exists("README.md")
+    assert plan.summary() == {"copy": 1, "stage": 2, "write": 1}
+
+
+def test_plan_per_thread(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source").mkdir()
+    (tmp_path / "source" / "a.txt").write_text("a")
+
+    def bound_copy(plan):
+        with plan.bind():
+            Module.copy_dir("source", "planned")
+
+    with Plan() as plan:
+        # Threads not bound to the plan work on the disk
+        thread = threading.Thread(target=Module.copy_dir, args=("source", "copied"))
+        thread.start()
+        thread.join()
+        thread = threading.Thread(target=bound_copy, args=(plan, ))
+        thread.start()
+        thread.join()
+    assert os.path.exists(os.path.join("copied", "a.txt"))
+    assert not os.path.exists("planned")
+    assert [operation.target for operation in plan.operations] == [os.path.join("planned", "a.txt")]
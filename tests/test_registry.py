@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from xia_module import ModuleRegistry
+
+
+def test_lazy_import():
+    code = "import sys, xia_module; print('xia_module.module' in sys.modules); xia_module.Module; " \
+           "print('xia_module.module' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, env=env)
+    assert output.stdout.split() == ["False", "True"]
+
+
+def test_registry_cache(tmp_path, monkeypatch):
+    calls = []
+    fingerprint = ["v1"]
+
+    def discover():
+        calls.append(1)
+        return {"xia-module": {"package": "xia_module", "class": "Module", "distribution": "xia-module"}}
+
+    monkeypatch.setattr(ModuleRegistry, "discover", staticmethod(discover))
+    monkeypatch.setattr(ModuleRegistry, "get_fingerprint", staticmethod(lambda: fingerprint[0]))
+    cache_file = str(tmp_path / "registry.json")
+    assert ModuleRegistry(cache_file).get_module_class("xia-module").module_name == "xia-module"
+    ModuleRegistry(cache_file).get_index()
+    assert len(calls) == 1
+    fingerprint[0] = "v2"
+    ModuleRegistry(cache_file).get_index()
+    assert len(calls) == 2
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from xia_module import Module, GitStaging, ModuleOrchestrator, CommandRunner
+
+
+def python_command(code: str):
+    return [sys.executable, "-c", code]
+
+
+def test_concurrency_limit(tmp_path):
+    events_file = str(tmp_path / "events.txt")
+    code = (f"import time; fp = open({events_file!r}, 'a'); fp.write('+'); fp.flush(); time.sleep(0.1); "
+            f"fp.write('-'); fp.close(); print({{}})")
+    runner = CommandRunner(max_concurrency=2)
+    results = runner.run_all([python_command(code.format(i)) for i in range(4)])
+    assert [result.stdout.strip() for result in results] == ["0", "1", "2", "3"]
+    assert all(result.ok for result in results)
+    # Count commands running at the same time from their start / end events
+    running, max_running = 0, 0
+    with open(events_file) as fp:
+        for event in fp.read():
+            running += 1 if event == "+" else -1
+            max_running = max(max_running, running)
+    assert max_running <= 2
+
+
+def test_sequence():
+    runner = CommandRunner()
+    results = runner.run_all([])
+    assert results == []
+    results = asyncio.run(runner.sequence([python_command("print(1)"), python_command("import sys; sys.exit(1)"),
+                                           python_command("print(3)")]))
+    assert [result.returncode for result in results] == [0, 1]
+
+
+def test_failures():
+    runner = CommandRunner(timeout=0.5)
+    failed, timed_out, missing = runner.run_all([
+        python_command("import sys; sys.stderr.write('boom'); sys.exit(3)"),
+        python_command("import time; time.sleep(5)"),
+        ["xia-command-not-found"],
+    ])
+    assert failed.returncode == 3 and failed.stderr == "boom"
+    with pytest.raises(RuntimeError):
+        failed.check()
+    assert timed_out.timed_out and timed_out.returncode is None
+    with pytest.raises(TimeoutError):
+        timed_out.check()
+    assert missing.returncode == 127
+
+
+def test_flush_async(tmp_path, monkeypatch):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    monkeypatch.chdir(tmp_path)
+    for file_name in ["a.txt", "b.txt", "c.txt"]:
+        (tmp_path / file_name).write_text(file_name)
+    staging = GitStaging(batch_size=2)
+    for file_name in ["a.txt", "b.txt", "c.txt"]:
+        staging.add(file_name)
+    reports = asyncio.run(staging.flush_async())
+    assert [report["files"] for report in reports] == [2, 1]
+    output = subprocess.run(["git", "diff", "--cached", "--name-only"], check=True, capture_output=True, text=True)
+    assert output.stdout.split() == ["a.txt", "b.txt", "c.txt"]
+
+
+class Echo(Module):
+    module_name = "echo"
+
+    def get_commands(self, action: str, **kwargs) -> list:
+        return [python_command(f"print('{self.module_name}-{action}')")]
+
+
+class Other(Echo):
+    module_name = "other"
+    deploy_depends = ["echo"]
+
+
+def test_run_commands():
+    results = ModuleOrchestrator([Other, Echo]).run_commands("compile")
+    assert list(results) == ["echo", "other"]
+    assert results["other"][0].stdout.strip() == "other-compile"
+
+
+def test_validate_without_module_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert Module().validate() == []
+
+
+def test_validate_commands(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.join("iac", "modules", "xia-module"))
+    commands = Module().get_commands("validate")
+    assert [command[2:3] for command in commands[1:]] == [["init"], ["validate"]]
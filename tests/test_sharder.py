@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+import yaml
+from xia_module import Module
+from xia_module.sharder import ConfigSharder
+
+
+class BucketModule(Module):
+    module_name = "gcs-bucket"
+
+
+BASE_FILE = """module "gcs-bucket" {
+  source = "../../modules/gcs-bucket"
+  config_file = "../../../config/gcs-bucket.yaml"
+}
+"""
+
+
+def write_config(file_name: str, count: int, start: int = 0, suffix: str = ""):
+    with open(file_name, "w") as fp:
+        for i in range(start, start + count):
+            fp.write(f"bucket-{i}:\n  region: eu{suffix}\n")
+
+
+def test_sharder(tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    write_config(str(source_dir / "a.yaml"), 50)
+    write_config(str(source_dir / "b.yml"), 50, start=50)
+    shard_dir = str(tmp_path / "shards")
+    sharder = ConfigSharder(shard_dir, shard_count=8)
+    result = sharder.compile(source_dir=str(source_dir))
+    assert len(result.written) == 8 and result.unchanged == []
+    manifest = json.loads((tmp_path / "shards" / "manifest.json").read_text())
+    assert sum(shard["keys"] for shard in manifest["shards"].values()) == 100
+    merged = {}
+    for shard_file in result.written:
+        with open(shard_file) as fp:
+            merged.update(sharder.backend.load(fp))
+    assert merged == dict(sharder.iter_items(source_dir=str(source_dir)))
+    # Only the shard of the changed key is rewritten
+    with open(source_dir / "b.yml", "a") as fp:
+        fp.write("bucket-new:\n  region: us\n")
+    result = ConfigSharder(shard_dir, shard_count=8).compile(source_dir=str(source_dir))
+    assert result.written == [sharder.get_shard_file(ConfigSharder.get_shard_index("bucket-new", 8))]
+    assert len(result.unchanged) == 7
+    # Reducing shard count removes obsolete shards
+    result = ConfigSharder(shard_dir, shard_count=2).compile(source_dir=str(source_dir))
+    assert len(result.removed) == 6
+    assert sorted(os.listdir(shard_dir)) == ["manifest.json", "shard-0.yaml", "shard-1.yaml"]
+
+
+def test_duplicate_key(tmp_path):
+    write_config(str(tmp_path / "a.yaml"), 2)
+    write_config(str(tmp_path / "b.yaml"), 2)
+    with pytest.raises(ValueError):
+        list(ConfigSharder(str(tmp_path / "shards")).iter_items(source_dir=str(tmp_path)))
+
+
+def test_streaming(tmp_path):
+    (tmp_path / "a.yaml").write_text("base: &base {region: eu}\nb1: *base\nb2: [1, 2]\nb3: {broken\n")
+    items = ConfigSharder.iter_file_items(str(tmp_path / "a.yaml"), stream_threshold=0)
+    # Items are produced before the rest of the file is parsed
+    assert next(items) == ("base", {"region": "eu"})
+    assert next(items) == ("b1", {"region": "eu"})
+    assert next(items) == ("b2", [1, 2])
+    with pytest.raises(yaml.YAMLError):
+        next(items)
+    for stream_threshold in [0, None]:
+        (tmp_path / "empty.yaml").write_text("# nothing\n")
+        assert list(ConfigSharder.iter_file_items(str(tmp_path / "empty.yaml"), stream_threshold)) == []
+        (tmp_path / "list.yaml").write_text("- a\n")
+        with pytest.raises(ValueError):
+            list(ConfigSharder.iter_file_items(str(tmp_path / "list.yaml"), stream_threshold))
+
+
+def test_small_file_loading(tmp_path):
+    (tmp_path / "a.yaml").write_text("base: &base {region: eu}\nb1: *base\nb2: [1, 2]\n")
+    # Small files are loaded at once with the same result
+    assert list(ConfigSharder.iter_file_items(str(tmp_path / "a.yaml"))) == \
+        list(ConfigSharder.iter_file_items(str(tmp_path / "a.yaml"), stream_threshold=0))
+
+
+def test_compile(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert BucketModule().compile() is None
+    os.makedirs(os.path.join("iac", "environments", "base"))
+    with open(os.path.join("iac", "environments", "base", "gcs-bucket.tf"), "w") as fp:
+        fp.write(BASE_FILE)
+    os.makedirs("config")
+    write_config(os.path.join("config", "gcs-bucket.yaml"), 20)
+    result = BucketModule().compile(shard_count=4)
+    assert len(result.written) == 4
+    assert os.path.exists(os.path.join(".xia", "shards", "gcs-bucket", "manifest.json"))
+    result = BucketModule().compile(shard_count=4)
+    assert result.written == [] and len(result.unchanged) == 4
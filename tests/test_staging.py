@@ -0,0 +1,127 @@
+import os
+import subprocess
+import time
+
+import pytest
+from xia_module import Module, GitStaging, ModuleOrchestrator
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def staged_files():
+    output = subprocess.run(["git", "diff", "--cached", "--name-only"], check=True, capture_output=True, text=True)
+    return sorted(output.stdout.split())
+
+
+def test_batched_staging(git_repo):
+    source_dir = git_repo / "source"
+    (source_dir / "sub").mkdir(parents=True)
+    for file_name in ["a.txt", "b.txt", os.path.join("sub", "c.txt")]:
+        (source_dir / file_name).write_text(file_name)
+    with GitStaging(batch_size=2) as staging:
+        Module.copy_dir(str(source_dir), "target", git_add=True)
+        assert staged_files() == []
+    assert len(staging.batches) == 2
+    assert staged_files() == ["target/a.txt", "target/b.txt", "target/sub/c.txt"]
+
+
+def test_nested_staging(git_repo):
+    (git_repo / "a.txt").write_text("a")
+    with GitStaging() as outer:
+        with GitStaging():
+            Module.git_add("a.txt")
+        assert outer.paths == ["a.txt"]
+        assert staged_files() == []
+    assert staged_files() == ["a.txt"]
+
+
+class ParallelModule(Module):
+    module_name = "parallel"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.init_dir = os.path.join("..", "source", self.module_name)
+
+    def _build_config(self, **kwargs):
+        # Staged after the other module has probably finished its initialization
+        time.sleep(0.1)
+        with open(f"late-{self.module_name}.txt", "w") as fp:
+            fp.write(self.module_name)
+        self.git_add(f"late-{self.module_name}.txt")
+
+
+class ModuleA(ParallelModule):
+    module_name = "a"
+
+
+class ModuleB(ParallelModule):
+    module_name = "b"
+
+    def _build_config(self, **kwargs):
+        time.sleep(0.2)
+        super()._build_config(**kwargs)
+
+
+def test_parallel_initialize(tmp_path, monkeypatch):
+    app_dir = tmp_path / "app"
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    for module_name in ["a", "b"]:
+        (tmp_path / "source" / module_name).mkdir(parents=True)
+        (tmp_path / "source" / module_name / f"{module_name}.txt").write_text(module_name)
+    (app_dir / "config").mkdir()
+    (app_dir / "config" / "landscape.yaml").write_text("cicd: none\n")
+    ModuleOrchestrator([ModuleA, ModuleB], max_workers=2).run("initialize")
+    assert staged_files() == ["a.txt", "b.txt", "late-a.txt", "late-b.txt"]
+
+
+def test_nested_session_after_parent_exit(git_repo):
+    (git_repo / "a.txt").write_text("a")
+    with GitStaging() as outer:
+        inner = GitStaging()
+        with GitStaging() as middle:
+            inner.__enter__()
+        Module.git_add("a.txt")
+        inner.__exit__(None, None, None)
+        # middle has exited, the paths go to outer
+        assert middle.paths == [] and outer.paths == ["a.txt"]
+    assert staged_files() == ["a.txt"]
+
+
+class FailingModule(ParallelModule):
+    module_name = "b"
+
+    def _build_config(self, **kwargs):
+        raise ValueError("Broken configuration")
+
+
+def test_failed_run_staging(tmp_path, monkeypatch):
+    app_dir = tmp_path / "app"
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    for module_name in ["a", "b"]:
+        (tmp_path / "source" / module_name).mkdir(parents=True)
+        (tmp_path / "source" / module_name / f"{module_name}.txt").write_text(module_name)
+    (app_dir / "config").mkdir()
+    (app_dir / "config" / "landscape.yaml").write_text("cicd: none\n")
+    with pytest.raises(ValueError):
+        ModuleOrchestrator([ModuleA, FailingModule], max_workers=2).run("initialize")
+    assert staged_files() == ["a.txt", "b.txt", "late-a.txt"]
+
+
+def test_failed_initialize_staging(tmp_path, monkeypatch):
+    app_dir = tmp_path / "app"
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    (tmp_path / "source" / "b").mkdir(parents=True)
+    (tmp_path / "source" / "b" / "b.txt").write_text("b")
+    (app_dir / "config").mkdir()
+    (app_dir / "config" / "landscape.yaml").write_text("cicd: none\n")
+    with pytest.raises(ValueError):
+        FailingModule().initialize()
+    assert staged_files() == ["b.txt"]
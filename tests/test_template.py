@@ -0,0 +1,87 @@
+import os
+import subprocess
+
+import pytest
+from xia_module import Module
+
+
+class TemplateModule(Module):
+    def __init__(self, template_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self.template_dir = template_dir
+        self.env = self.get_template_env(template_dir)
+
+
+def test_build_template(tmp_path, monkeypatch):
+    template_dir = tmp_path / "template"
+    (template_dir / "config").mkdir(parents=True)
+    (template_dir / "README.md").write_text("# {{ app_name }}\n")
+    (template_dir / "config" / "app.yaml").write_text("name: {{ app_name }}\n{% if debug %}debug: true\n{% endif %}")
+    app_dir = tmp_path / "app"
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    module = TemplateModule(str(template_dir))
+    assert module.env is TemplateModule(str(template_dir)).env
+    module._build_template(app_name="demo", debug=True)
+    assert (app_dir / "README.md").read_text() == "# demo\n"
+    assert (app_dir / "config" / "app.yaml").read_text() == "name: demo\ndebug: true\n"
+    staged = subprocess.run(["git", "diff", "--cached", "--name-only"], check=True, capture_output=True, text=True)
+    assert ".xia/manifests/xia-module-templates.json" in staged.stdout.split()
+    # Unchanged rendering doesn't touch the target
+    os.utime(app_dir / "README.md", ns=(0, 0))
+    module._build_template(app_name="demo", debug=False)
+    assert os.stat(app_dir / "README.md").st_mtime_ns == 0
+    assert (app_dir / "config" / "app.yaml").read_text() == "name: demo\n"
+
+
+def test_build_template_errors(tmp_path, monkeypatch):
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    (template_dir / "README.md").write_text("# {{ app_name }}\n")
+    (template_dir / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff\xfe")
+    (template_dir / "deploy.yml").write_text("sha: ${{ github.sha }}\n")
+    app_dir = tmp_path / "app"
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    module = TemplateModule(str(template_dir))
+    errors = module._build_template(app_name="demo")
+    assert list(errors) == ["deploy.yml"]
+    assert (app_dir / "logo.png").read_bytes() == b"\x89PNG\r\n\x1a\n\xff\xfe"
+    assert (app_dir / "README.md").read_text() == "# demo\n"
+    assert not (app_dir / "deploy.yml").exists()
+
+
+def test_build_template_keeps_edited_files(tmp_path, monkeypatch):
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    (template_dir / "README.md").write_text("# {{ app_name }}\n")
+    (template_dir / "NOTES.md").write_text("{{ app_name }} notes\n")
+    app_dir = tmp_path / "app"
+    app_dir.mkdir()
+    (app_dir / "NOTES.md").write_text("my own notes\n")
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    module = TemplateModule(str(template_dir))
+    module._build_template(app_name="demo")
+    # Existing file not rendered by the module
+    assert (app_dir / "NOTES.md").read_text() == "my own notes\n"
+    module._build_template(app_name="other")
+    assert (app_dir / "README.md").read_text() == "# other\n"
+    # Rendered file edited by the user
+    (app_dir / "README.md").write_text("# edited\n")
+    module._build_template(app_name="demo")
+    assert (app_dir / "README.md").read_text() == "# edited\n"
+
+
+def test_initialize_template_errors(tmp_path, monkeypatch):
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    (template_dir / "README.md").write_text("# {{ app_name }}\n")
+    (template_dir / "deploy.yml").write_text("sha: ${{ github.sha }}\n")
+    app_dir = tmp_path / "app"
+    subprocess.run(["git", "init", "-q", str(app_dir)], check=True)
+    monkeypatch.chdir(app_dir)
+    with pytest.raises(ValueError, match="deploy.yml"):
+        TemplateModule(str(template_dir)).initialize(app_name="demo")
+    staged = subprocess.run(["git", "diff", "--cached", "--name-only"], check=True, capture_output=True, text=True)
+    assert sorted(staged.stdout.split()) == [".xia/manifests/xia-module-templates.json", "README.md"]
@@ -0,0 +1,49 @@
+import os
+
+from xia_module import Module
+from xia_module.terraform import HclParser, TerraformIndex
+
+BASE_FILE = '''# Module gcs-bucket
+module "gcs-bucket" {
+  source = "../../modules/gcs-bucket"  // local module
+  config_file = "../../../config/gcs-bucket.yaml"
+  config_dir = "../../../config/gcs-bucket"
+  name = "${var.env == "prd" ? "main" : "dev"}"
+  labels = {
+    team = "data"
+  }
+  depends_on = [module.project, module.network]
+}
+'''
+
+
+class BucketModule(Module):
+    module_name = "gcs-bucket"
+
+
+def test_hcl_parser():
+    root = HclParser.parse(BASE_FILE + 'terraform {\n  backend "gcs" {\n    prefix = "state"\n  }\n}\n')
+    module_block, terraform_block = root.blocks
+    assert module_block.labels == ["gcs-bucket"] and module_block.line == 2
+    assert module_block.attributes["name"] == '${var.env == "prd" ? "main" : "dev"}'
+    assert module_block.attributes["labels"] == '{\n    team = "data"\n  }'
+    assert terraform_block.find_attribute("prefix") == "state"
+    assert HclParser.parse_attributes('x = "a"\nbroken {{\n').attributes == {"x": "a"}
+
+
+def test_config_file_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    base_dir = os.path.join("iac", "environments", "base")
+    assert BucketModule().get_config_file_path() == (None, None)
+    os.makedirs(base_dir)
+    with open(os.path.join(base_dir, "gcs-bucket.tf"), "w") as fp:
+        fp.write(BASE_FILE)
+    assert BucketModule().get_config_file_path() == ("./config/gcs-bucket.yaml", "./config/gcs-bucket")
+    index = TerraformIndex.load(base_dir)
+    assert TerraformIndex.load(base_dir) is index
+    assert index.get_module("gcs-bucket").attributes["source"] == "../../modules/gcs-bucket"
+    assert index.get_module_dependencies("gcs-bucket") == ["project", "network"]
+    with open(os.path.join(base_dir, "gcs-bucket.tf"), "w") as fp:
+        fp.write(BASE_FILE.replace("gcs-bucket.yaml", "bucket.yaml").replace("  config_dir", "  # config_dir"))
+    os.utime(os.path.join(base_dir, "gcs-bucket.tf"), ns=(1, 1))
+    assert BucketModule().get_config_file_path() == ("./config/bucket.yaml", None)
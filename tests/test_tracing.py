@@ -0,0 +1,33 @@
+import json
+
+from xia_module import Module
+from xia_module.tracing import Tracer, tracer
+
+
+def test_tracer_hook(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source").mkdir()
+    (tmp_path / "source" / "a.txt").write_text("a")
+    events = []
+    tracer.add_hook(events.append)
+    try:
+        Module.copy_dir("source", "target")
+    finally:
+        tracer.remove_hook(events.append)
+    span = [event for event in events if event["ph"] == "X"][0]
+    assert span["name"] == "copy_dir" and span["args"]["target_dir"] == "target" and span["dur"] >= 0
+    assert {"name": "files_copied", "value": 1} in [{"name": event["name"], "value": event["args"][event["name"]]}
+                                                     for event in events if event["ph"] == "C"]
+
+
+def test_chrome_trace(tmp_path):
+    trace_file = str(tmp_path / "trace.json")
+    local_tracer = Tracer(trace_file)
+    with local_tracer.span("initialize", module="xia-module"):
+        local_tracer.count("files_staged", 3)
+    local_tracer.dump()
+    with open(trace_file) as fp:
+        trace = json.load(fp)
+    assert [event["name"] for event in trace["traceEvents"]] == ["files_staged", "initialize"]
+    assert trace["otherData"]["counters"] == {"files_staged": 3}
+    assert not Tracer().enabled
@@ -0,0 +1,89 @@
+import pytest
+from xia_module import Module
+from xia_module.cicd.assembler import WorkflowAssembler
+from xia_module.cicd.github import GitHubWorkflow
+from xia_module.cicd.trigger import TriggerCompiler
+
+PATTERNS = [
+    (".*", {"push": {"branches": "**", "tags": "*"}}),
+    ("refs/heads/.*", {"push": {"branches": ["**"]}}),
+    ("refs/tags/.*", {"push": {"tags": ["*"]}}),
+    ("refs/heads/main", {"push": {"branches": ["main"]}}),
+    ("refs/heads/(main|develop)", {"push": {"branches": ["main", "develop"]}}),
+    ("^refs/heads/(?:main|release/.*)$", {"push": {"branches": ["main", "release/**"]}}),
+    ("refs/heads/feature/[^/]+", {"push": {"branches": ["feature/*"]}}),
+    ("refs/heads/(dev|feat)/(a|b)", {"push": {"branches": ["dev/a", "dev/b", "feat/a", "feat/b"]}}),
+    (r"refs/tags/v\d+\.\d+\.\d+", {"push": {"tags": ["v[0-9]+.[0-9]+.[0-9]+"]}}),
+    ("refs/tags/v[0-9]+-rc[0-9]?", {"push": {"tags": ["v[0-9]+-rc[0-9]?"]}}),
+    ("refs/heads/main|refs/tags/.*", {"push": {"branches": ["main"], "tags": ["*"]}}),
+    ("refs/(heads/main|tags/v.*)", {"push": {"branches": ["main"], "tags": ["v**"]}}),
+    ("refs/heads/(main|main)", {"push": {"branches": ["main"]}}),
+    (r"refs/heads/c\+\+", {"push": {"branches": [r"c\+\+"]}}),
+]
+
+INVALID_PATTERNS = [
+    "refs/heads/a.b",
+    "refs/heads/a*",
+    "refs/heads/a{2}",
+    "refs/heads/(a|b)+",
+    "refs/heads/(main",
+    "refs/heads/main)",
+    "refs/pull/.*",
+    "refs/heads/[^a]",
+    r"refs/heads/\s",
+    "main",
+    "push",
+]
+
+
+@pytest.mark.parametrize("pattern,expected", PATTERNS)
+def test_compile_pattern(pattern, expected):
+    assert TriggerCompiler.compile_pattern(pattern) == expected
+    assert Module._regex_to_github_actions(pattern) == {"on": expected}
+    assert GitHubWorkflow._regex_to_github_actions(pattern) == {"on": expected}
+
+
+@pytest.mark.parametrize("pattern", INVALID_PATTERNS)
+def test_invalid_pattern(pattern):
+    with pytest.raises(ValueError):
+        TriggerCompiler.compile_pattern(pattern)
+
+
+def test_compile_trigger():
+    assert TriggerCompiler.compile_trigger("release") == {"release": {"types": "published"}}
+    assert TriggerCompiler.compile_trigger("pull_request", "refs/heads/main") == \
+        {"pull_request": {"branches": ["main"]}}
+    with pytest.raises(ValueError):
+        TriggerCompiler.compile_trigger("pull_request", "refs/tags/.*")
+    with pytest.raises(ValueError):
+        TriggerCompiler.compile_trigger("schedule")
+
+
+def test_compile_landscape():
+    environments = {"dev": {"match_branch": "refs/heads/main"}, "prd": {"match_branch": "refs/tags/.*"}}
+    triggers = TriggerCompiler.compile_landscape(environments)
+    assert triggers == {"dev": {"push": {"branches": ["main"]}}, "prd": {"push": {"tags": ["*"]}}}
+    assert TriggerCompiler.compile_landscape(dict(environments)) is triggers
+    # Memo is bounded
+    for i in range(TriggerCompiler.max_landscapes):
+        TriggerCompiler.compile_landscape({"dev": {"match_branch": f"refs/heads/branch-{i}"}})
+    assert len(TriggerCompiler._landscapes) == TriggerCompiler.max_landscapes
+    assert TriggerCompiler.compile_landscape(environments) is not triggers
+
+
+def test_assembler_uses_compiled_landscape(tmp_path, monkeypatch):
+    calls = []
+    compile_trigger = TriggerCompiler.compile_trigger.__func__
+
+    def counted_compile_trigger(cls, match_event="push", match_branch=".*"):
+        calls.append(match_branch)
+        return compile_trigger(cls, match_event, match_branch)
+
+    monkeypatch.setattr(TriggerCompiler, "compile_trigger", classmethod(counted_compile_trigger))
+    landscape_config = {"environments": {"dev": {"match_branch": "refs/heads/counted", "stages": ["build"]},
+                                         "prd": {"match_branch": "refs/tags/counted-.*", "stages": ["build"]}}}
+    for env_dir in ["first", "second"]:
+        WorkflowAssembler(landscape_config, workflow_dir=str(tmp_path / env_dir)).assemble([])
+    assert calls == ["refs/heads/counted", "refs/tags/counted-.*"]
+    assert GitHubWorkflow(str(tmp_path / "second" / "workflow-prd.yml")).data["on"] == \
+        {"push": {"tags": ["counted-**"]}}
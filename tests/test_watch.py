@@ -0,0 +1,110 @@
+import os
+import subprocess
+
+import pytest
+from xia_module import Module
+from xia_module.cicd.github import GitHubWorkflow
+from xia_module.watch import ModuleWatcher, InotifyWatcher, PollingWatcher
+
+
+class WatchedModule(Module):
+    module_name = "watched"
+
+    def __init__(self, template_root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.init_dir = os.path.join(template_root, "init")
+        self.template_dir = os.path.join(template_root, "template")
+        self.cicd_dir = os.path.join(template_root, "cicd")
+        self.config_dir = os.path.join(template_root, "config")
+        self.built = []
+
+    def _build_config(self, **kwargs):
+        self.built.append(("config", kwargs))
+
+    @classmethod
+    def build_cicd_workflows(cls, modules: list, landscape_config: dict = None, refresh: bool = False,
+                             replace: bool = False):
+        modules[0].built.append(("workflows", sorted(landscape_config.get("environments", {}))))
+        return []
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    for dir_name in ["init", "template", "cicd", "config"]:
+        (tmp_path / "templates" / dir_name).mkdir(parents=True)
+    (tmp_path / "app" / "config").mkdir(parents=True)
+    (tmp_path / "app" / "config" / "landscape.yaml").write_text("environments:\n  dev: {}\n  prd: {}\n")
+    subprocess.run(["git", "init", "-q", str(tmp_path / "app")], check=True)
+    monkeypatch.chdir(tmp_path / "app")
+    return WatchedModule(str(tmp_path / "templates"))
+
+
+@pytest.mark.parametrize("watcher_class", [PollingWatcher, InotifyWatcher])
+def test_watchers(tmp_path, watcher_class):
+    (tmp_path / "sub").mkdir()
+    watcher = InotifyWatcher([str(tmp_path)]) if watcher_class is InotifyWatcher else PollingWatcher([str(tmp_path)], 0.01)
+    (tmp_path / "sub" / "a.txt").write_text("a")
+    assert watcher.wait(2) == {str(tmp_path / "sub" / "a.txt")}
+    assert watcher.wait(0.05) == set()
+    watcher.close()
+
+
+def test_module_watcher(module, tmp_path):
+    watcher = ModuleWatcher([module], use_inotify=False, interval=0.01, debounce=0.01, config={"key": "value"})
+    assert watcher.classify({os.path.join(module.config_dir, "app.yaml"), "config/landscape.yaml"}) == \
+        {("watched", "config"), ("", "landscape")}
+    (tmp_path / "templates" / "config" / "app.yaml").write_text("# key: default\n")
+    (tmp_path / "app" / "config" / "landscape.yaml").write_text("environments:\n  dev: {}\n  prd: {a: 1}\n")
+    watcher.run(max_rebuilds=1, timeout=2)
+    assert module.built == [("workflows", ["prd"]), ("config", {"key": "value"})]
+
+
+class BrokenModule(WatchedModule):
+    def _build_config(self, **kwargs):
+        raise ValueError("Broken configuration")
+
+
+def test_rebuild_errors(tmp_path, monkeypatch):
+    for dir_name in ["init", "template", "cicd", "config"]:
+        (tmp_path / "templates" / dir_name).mkdir(parents=True)
+    (tmp_path / "templates" / "init" / "a.txt").write_text("a")
+    (tmp_path / "app" / "config").mkdir(parents=True)
+    (tmp_path / "app" / "config" / "landscape.yaml").write_text("environments:\n  dev: {}\n")
+    subprocess.run(["git", "init", "-q", str(tmp_path / "app")], check=True)
+    monkeypatch.chdir(tmp_path / "app")
+    watcher = ModuleWatcher([BrokenModule(str(tmp_path / "templates"))], use_inotify=False, interval=0.01,
+                            debounce=0.01)
+    errors = watcher.rebuild({("watched", "config"), ("watched", "init")})
+    assert list(errors) == [("watched", "config")]
+    assert (tmp_path / "app" / "a.txt").exists()
+    # The watch loop keeps running after a failed rebuild
+    (tmp_path / "templates" / "config" / "app.yaml").write_text("key: value\n")
+    watcher.run(max_rebuilds=1, timeout=2)
+
+
+class CicdModule(Module):
+    module_name = "cicd-watched"
+
+    def __init__(self, template_root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cicd_dir = os.path.join(template_root, "cicd")
+
+
+def test_rebuild_cicd_edited_step(tmp_path, monkeypatch):
+    (tmp_path / "templates" / "cicd" / "github" / "actions").mkdir(parents=True)
+    module_workflow = tmp_path / "templates" / "cicd" / "github" / "workflow.yml"
+    module_workflow.write_text("jobs:\n  deploy:\n    steps:\n      - id: deploy\n        run: echo v1\n")
+    (tmp_path / "app" / "config").mkdir(parents=True)
+    (tmp_path / "app" / "config" / "landscape.yaml").write_text(
+        "environments:\n  dev:\n    match_branch: refs/heads/main\n    stages: [deploy]\n"
+    )
+    subprocess.run(["git", "init", "-q", str(tmp_path / "app")], check=True)
+    monkeypatch.chdir(tmp_path / "app")
+    watcher = ModuleWatcher([CicdModule(str(tmp_path / "templates"))], use_inotify=False, interval=0.01,
+                            debounce=0.01)
+    assert watcher.rebuild({("cicd-watched", "cicd")}) == {}
+    module_workflow.write_text("jobs:\n  deploy:\n    steps:\n      - id: deploy\n        run: echo version-2\n")
+    assert watcher.rebuild({("cicd-watched", "cicd")}) == {}
+    workflow = GitHubWorkflow(os.path.join(".github", "workflows", "workflow-dev.yml"))
+    assert [step["id"] for step in workflow.data["jobs"]["deploy"]["steps"]] == ["checkout-code", "deploy"]
+    assert workflow.data["jobs"]["deploy"]["steps"][1]["run"] == "echo version-2"
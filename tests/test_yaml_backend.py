@@ -0,0 +1,54 @@
+import importlib
+import io
+
+import pytest
+import yaml
+from ruamel.yaml.comments import CommentedMap
+from xia_module import yaml_backend
+from xia_module.yaml_backend import YamlBackend, get_backend, register_backend
+
+CONTENT = "# Workflow\nname: Workflow\njobs:\n  build:\n    needs: [test]\n"
+
+
+def test_backend_selection():
+    assert get_backend().name == "fast"
+    assert get_backend(readonly=False).name == "roundtrip"
+    assert get_backend("roundtrip", readonly=True).name == "roundtrip"
+    with pytest.raises(ValueError):
+        get_backend("unknown")
+    fast_data = get_backend("fast").load(CONTENT)
+    roundtrip_data = get_backend("roundtrip").load(CONTENT)
+    assert type(fast_data) is dict and isinstance(roundtrip_data, CommentedMap)
+    assert fast_data == roundtrip_data
+    stream = io.StringIO()
+    get_backend("roundtrip").dump(roundtrip_data, stream)
+    assert stream.getvalue().startswith("# Workflow\n")
+
+
+def test_register_backend():
+    with pytest.raises(TypeError):
+        YamlBackend()
+
+    class UpperBackend(YamlBackend):
+        name = "upper"
+
+        def load(self, stream):
+            return yaml.safe_load(stream.upper())
+
+        def dump(self, data, stream, **kwargs):
+            yaml.safe_dump(data, stream)
+
+    register_backend(UpperBackend())
+    assert get_backend("upper").load("a: b") == {"A": "B"}
+
+
+def test_libyaml_fallback(monkeypatch):
+    monkeypatch.delattr(yaml, "CSafeLoader", raising=False)
+    try:
+        importlib.reload(yaml_backend)
+        assert not yaml_backend.HAS_LIBYAML
+        assert yaml_backend.SafeLoader is yaml.SafeLoader
+        assert yaml_backend.get_backend("fast").load(CONTENT)["jobs"] == {"build": {"needs": ["test"]}}
+    finally:
+        monkeypatch.undo()
+        importlib.reload(yaml_backend)
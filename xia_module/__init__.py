@@ -1,11 +1,37 @@
-from xia_module.module import Module
+import importlib
 
 modules = {
     "xia-module": "Module"
 }
 
+# Attributes loaded at first access (PEP 562), listing modules doesn't need to import heavy dependencies
+_lazy_attributes = {
+    "Module": "xia_module.module",
+    "GitStaging": "xia_module.staging",
+    "ModuleOrchestrator": "xia_module.orchestrator",
+    "ModuleRegistry": "xia_module.registry",
+    "CommandRunner": "xia_module.runner",
+}
+
 __all__ = [
-    "Module"
+    "Module",
+    "GitStaging",
+    "ModuleOrchestrator",
+    "ModuleRegistry",
+    "CommandRunner"
 ]
 
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
 __version__ = "0.0.27"
@@ -0,0 +1,87 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+
+class ParseCache:
+    """Process-wide cache of parsed files
+
+    Entries are keyed on file path and loader and are only valid while the file keeps the same mtime and size.
+    Each consumer receives its own deep copy so that in-place changes never reach the cached object.
+    """
+    def __init__(self, max_size: int = 256):
+        """Parse cache
+
+        Args:
+            max_size (int): Maximum number of cached files, least recently used files are evicted first
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, filename: str, loader, loader_name: str = ""):
+        """Load a file through the cache
+
+        Args:
+            filename (str): file path
+            loader: callable parsing an opened file object
+            loader_name (str): name of loader, part of the cache key. Default to the qualified name of loader
+
+        Returns:
+            Deep copy of parsed data
+        """
+        loader_name = loader_name or f"{loader.__module__}.{loader.__qualname__}"
+        key = (os.path.abspath(filename), loader_name)
+        file_stat = os.stat(filename)
+        signature = (file_stat.st_mtime_ns, file_stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+        with open(filename) as fp:
+            data = loader(fp)
+        with self._lock:
+            self._entries[key] = (signature, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return copy.deepcopy(data)
+
+    def stats(self) -> dict:
+        """Cache statistics
+
+        Returns:
+            Dictionary of hits, misses, evictions and current size
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+
+def get_cache_dir(*names) -> str:
+    """Get a directory of the user level cache shared by all processes
+
+    Args:
+        *names: sub directory names
+
+    Returns:
+        directory path under ``$XDG_CACHE_HOME/xia-module`` (``~/.cache/xia-module`` by default)
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_home, "xia-module", *names)
+
+
+parse_cache = ParseCache()
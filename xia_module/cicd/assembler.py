@@ -0,0 +1,106 @@
+import os
+from xia_module.cicd.github import GitHubWorkflow
+from xia_module.cicd.trigger import TriggerCompiler
+from xia_module.plan import path_exists
+
+
+class WorkflowAssembler:
+    """Assemble the workflows of all environments for several modules in a single pass
+
+    Each environment workflow is loaded once, receives the stages of every module and is written once.
+    """
+    default_stages = ["test-local", "build", "deploy", "test-remote", "publish"]
+
+    def __init__(self, landscape_config: dict = None, cicd_stages: list = None,
+                 workflow_dir: str = os.path.join(".github", "workflows")):
+        """Workflow assembler
+
+        Args:
+            landscape_config (dict): landscape configuration
+            cicd_stages (list): stages of the default environment when no environment is defined
+            workflow_dir (str): directory of the generated workflows
+        """
+        self.landscape_config = landscape_config or {}
+        self.cicd_stages = cicd_stages or self.default_stages
+        self.workflow_dir = workflow_dir
+
+    def get_environments(self) -> dict:
+        default_env_config = {"base": {"match_branch": "refs/tags/.*", "stages": self.cicd_stages}}
+        return self.landscape_config.get("environments", default_env_config)
+
+    def get_workflow_file(self, env_name: str) -> str:
+        return os.path.join(self.workflow_dir, f"workflow-{env_name}.yml")
+
+    @classmethod
+    def get_module_workflow_file(cls, module) -> str:
+        return os.path.join(module.cicd_dir, "github", "workflow.yml")
+
+    def assemble_environment(self, env_name: str, env_config: dict, modules: list, refresh: bool = False,
+                             trigger: dict = None, replace: bool = False):
+        """Merge module workflows into the workflow of an environment
+
+        Args:
+            env_name (str): environment name
+            env_config (dict): environment configuration
+            modules (list): module instances in dependency order
+            refresh (bool): regenerate trigger and stage order of an existed workflow from the environment
+                configuration, settings of existed jobs are kept and their steps are merged back after module steps
+            trigger (dict): compiled ``on:`` configuration of the environment
+            replace (bool): replace steps of the existed workflow by module steps of the same id
+
+        Returns:
+            Workflow object and a flag to tell if it must be written
+        """
+        gh_action_filename = self.get_workflow_file(env_name)
+        to_write = not path_exists(gh_action_filename)
+        gh_action = GitHubWorkflow(gh_action_filename, workflow_name="", env_name=env_name, env_params=env_config,
+                                   trigger=trigger)
+        previous_action = None
+        if refresh and not to_write:
+            previous_action = gh_action
+            gh_action = GitHubWorkflow("", workflow_name=previous_action.data.get("name", ""), env_name=env_name,
+                                       env_params=env_config, trigger=trigger)
+            gh_action.filename = gh_action_filename
+            to_write = True
+        for module in modules:
+            module_gh_action_fn = self.get_module_workflow_file(module)
+            if os.path.exists(module_gh_action_fn):
+                module_action = GitHubWorkflow(module_gh_action_fn, cached=True)
+                gh_action.merge_workflow(module_action, stages=env_config.get("stages", []), replace=replace)
+                to_write = True
+        if previous_action is not None:
+            for stage_name in env_config.get("stages", []):
+                current_job = gh_action.get_stage_job(stage_name)
+                previous_job = previous_action.get_stage_job(stage_name)
+                # Only the stage order is regenerated, other settings of the existed job are kept
+                previous_job.pop("needs", None)
+                for key in [key for key in previous_job if key != "steps"]:
+                    current_job[key] = previous_job.pop(key)
+                # Module steps are already merged, only local steps of the existed workflow are kept
+                if "steps" in previous_job:
+                    current_steps = current_job.get("steps", [])
+                    previous_job["steps"] = [step for step in previous_job["steps"] if step not in current_steps]
+            gh_action.merge_workflow(previous_action, stages=env_config.get("stages", []))
+        return gh_action, to_write
+
+    def assemble(self, modules: list, refresh: bool = False, replace: bool = False) -> list:
+        """Assemble all environment workflows
+
+        Args:
+            modules (list): module instances in dependency order
+            refresh (bool): regenerate trigger and stage order of existed workflows, job settings are kept
+            replace (bool): replace steps of existed workflows by module steps of the same id
+
+        Returns:
+            list of written workflow files, unchanged workflows are not rewritten
+        """
+        written_files = []
+        environments = self.get_environments()
+        # Compiled before writing anything, fails if a trigger can't be translated
+        triggers = TriggerCompiler.compile_landscape(environments)
+        for env_name, env_config in environments.items():
+            gh_action, to_write = self.assemble_environment(env_name, env_config, modules, refresh,
+                                                            triggers[env_name], replace)
+            if to_write and gh_action.dump():
+                written_files.append(gh_action.filename)
+        return written_files
@@ -1,15 +1,17 @@
-import os
 import io
+from yaml import YAMLError
 from ruamel.yaml import YAML
+from ruamel.yaml.comments import CommentedMap, CommentedSeq
+from ruamel.yaml.error import CommentMark
+from ruamel.yaml.tokens import CommentToken
+from xia_module.cache import parse_cache
+from xia_module.cicd.trigger import TriggerCompiler
+from xia_module.yaml_backend import get_backend
+from xia_module.tracing import tracer
+from xia_module.plan import Plan, path_exists, read_text, write_text
 
 
 class GitHubWorkflow:
-    def load_data(self, data):
-        buffer = io.StringIO()
-        self.yaml.dump(data, buffer)
-        buffer.seek(0)
-        self.data = self.yaml.load(buffer)
-
     @classmethod
     def _extract_comments(cls, data):
         """Extract Comments from data objects
@@ -38,111 +40,228 @@ class GitHubWorkflow:
         for key, comment in comments.items():
             data.ca.items[key] = comment
 
-    def __init__(self, filename: str = "", workflow_name: str = "", env_name: str = "", env_params: dict = None):
+    def __init__(self, filename: str = "", workflow_name: str = "", env_name: str = "", env_params: dict = None,
+                 cached: bool = False, trigger: dict = None):
+        """GitHub Workflow
+
+        Args:
+            filename (str): workflow file, a new workflow is built in memory if it doesn't exist
+            workflow_name (str): workflow name of the new workflow
+            env_name (str): environment name of the new workflow
+            env_params (dict): environment parameters of the new workflow
+            cached (bool): load the existed file through the process-wide parse cache (for read-only templates)
+            trigger (dict): compiled ``on:`` configuration of the new workflow, compiled from env_params if not given
+        """
         self.yaml = YAML()
         self.filename = filename
-        if os.path.exists(filename):
-            with open(filename) as fp:
-                self.data = self.yaml.load(fp)
-            return
+        self._stage_names = None  # Indexes of stage order and step ids, built at first merge
+        self._stage_positions = {}
+        self._step_ids = {}
+        if path_exists(filename):
+            with tracer.span("yaml_load", category="yaml", file=filename, cached=cached):
+                if cached:
+                    backend = get_backend(readonly=False)
+                    self.data = parse_cache.load(filename, backend.load, backend.name)
+                elif Plan.current() is not None:
+                    self.data = self.yaml.load(read_text(filename))
+                else:
+                    with open(filename) as fp:
+                        self.data = self.yaml.load(fp)
+        else:
+            self.data = self.build_workflow(workflow_name, env_name, env_params, trigger)
+
+    @classmethod
+    def _to_commented(cls, data):
+        """Convert python objects to round-trip objects
+
+        Args:
+            data: python object
+
+        Returns:
+            CommentedMap / CommentedSeq for dict / list, data itself otherwise
+        """
+        if isinstance(data, dict):
+            return CommentedMap((key, cls._to_commented(value)) for key, value in data.items())
+        elif isinstance(data, list):
+            return CommentedSeq(cls._to_commented(item) for item in data)
+        return data
+
+    @classmethod
+    def _add_blank_line_after(cls, data, key):
+        """Add an empty line after the node of the given key
+
+        The comment is attached to the last scalar of the node, the same way the parser does when loading a file
+
+        Args:
+            data(CommentedBase): data object
+            key: key (or index) in the data object
+        """
+        value = data[key]
+        if isinstance(value, (dict, list)) and len(value) > 0:
+            cls._add_blank_line_after(value, list(value)[-1] if isinstance(value, dict) else len(value) - 1)
+        elif isinstance(data, list):
+            data.ca.items[key] = [CommentToken("\n\n", CommentMark(0), None), None, None, None]
         else:
-            env_params = env_params or {}
-            default_workflow_name = "Workflow" if not env_name or env_name == "base" else f"Workflow - {env_name}"
-            workflow_name = workflow_name if workflow_name else default_workflow_name
-            match_event = env_params.get("match_event", "push")
-            match_branch = env_params.get("match_branch", ".*")
-            runs_on = env_params.get("runs_on", "ubuntu-latest")
-            if match_event == "release":
-                trigger_event = {"release": {"types": "published"}}
-            else:
-                trigger_cfg = self._regex_to_github_actions(match_branch)
-                trigger_event = trigger_cfg.get("on", None)
-
-            self.load_data({"name": workflow_name, "on": trigger_event, "jobs": {}})
-            self.data.yaml_set_comment_before_after_key('on', before="\n")
-            self.data.yaml_set_comment_before_after_key('jobs', before="\n")
-
-            last_stage = ""
-            for stage_name in env_params.get("stages", []):
-                stage_header = {
-                    "if": True,
-                    "environment": env_name,
-                    "runs-on": runs_on,
-                    "steps": self.yaml.seq([
-                        self.yaml.map(id="checkout-code", uses="actions/checkout@v4")
-                    ])
-                }
-                if not env_name or env_name == "base":
-                    stage_header.pop("environment")
-                self.data["jobs"].update(self.yaml.map(**{stage_name: self.yaml.map(**stage_header)}))
-                if last_stage != "":  # Not the first stage
-                    self.data["jobs"].yaml_set_comment_before_after_key(stage_name, before="\n")
-                    self.data["jobs"][stage_name]["needs"] = last_stage
-                last_stage = stage_name
-            # Reload the generated file to get better format
-            self.dump()
-            with open(filename) as fp:
-                self.data = self.yaml.load(fp)
+            data.ca.items[key] = [None, None, CommentToken("\n\n", CommentMark(0), None), None]
+
+    @classmethod
+    def build_workflow(cls, workflow_name: str = "", env_name: str = "", env_params: dict = None,
+                       trigger: dict = None) -> CommentedMap:
+        """Build a new workflow in memory, formatted as if it was loaded from file
+
+        Args:
+            workflow_name (str): workflow name
+            env_name (str): environment name
+            env_params (dict): environment parameters
+            trigger (dict): compiled ``on:`` configuration, compiled from environment parameters if not given
+
+        Returns:
+            workflow data
+        """
+        env_params = env_params or {}
+        default_workflow_name = "Workflow" if not env_name or env_name == "base" else f"Workflow - {env_name}"
+        workflow_name = workflow_name if workflow_name else default_workflow_name
+        match_event = env_params.get("match_event", "push")
+        match_branch = env_params.get("match_branch", ".*")
+        runs_on = env_params.get("runs_on", "ubuntu-latest")
+        trigger_event = TriggerCompiler.compile_trigger(match_event, match_branch) if trigger is None else trigger
+
+        data = cls._to_commented({"name": workflow_name, "on": trigger_event, "jobs": {}})
+        last_stage = ""
+        for stage_name in env_params.get("stages", []):
+            stage_header = {
+                "if": True,
+                "environment": env_name,
+                "runs-on": runs_on,
+                "steps": [{"id": "checkout-code", "uses": "actions/checkout@v4"}]
+            }
+            if not env_name or env_name == "base":
+                stage_header.pop("environment")
+            if last_stage != "":  # Not the first stage
+                stage_header["needs"] = last_stage
+            data["jobs"][stage_name] = cls._to_commented(stage_header)
+            last_stage = stage_name
+        # Empty lines between top level keys and between stages
+        cls._add_blank_line_after(data, "name")
+        cls._add_blank_line_after(data, "on")
+        for stage_name in list(data["jobs"])[:-1]:
+            cls._add_blank_line_after(data["jobs"], stage_name)
+        return data
 
     @classmethod
     def _regex_to_github_actions(cls, pattern: str):
-        tag_dict = {".*": ["*"]}
-        actions_config = {'on': {'push': {}}}
-
-        if pattern == ".*":
-            return {'on': {'push': {"branches": "**", "tags": "*"}}}
-
-        if pattern.startswith("refs/tags/"):
-            tag_pattern = pattern.replace("refs/tags/", "")
-            actions_config['on']['push']['tags'] = tag_dict[tag_pattern]
-        elif pattern.startswith("refs/heads/"):
-            branch_pattern = pattern.replace("refs/heads/", "")
-            if branch_pattern == ".*":
-                actions_config['on']['push']['branches'] = ["**"]
-            elif branch_pattern.startswith("(") and branch_pattern.endswith(")"):
-                branch_pattern = branch_pattern[1:-1]
-                actions_config['on']['push']['branches'] = branch_pattern.split("|")
-            else:
-                actions_config['on']['push']['branches'] = [branch_pattern]
-        return actions_config
-
-    def dump(self):
+        return {"on": TriggerCompiler.compile_pattern(pattern)}
+
+    def dump(self) -> bool:
         """Dump final workflow to files
 
+        The file is not written if its content is unchanged or only differs by formatting
+
+        Returns:
+            True if the file is written
         """
         # Rethink: Might still need run empty stages if stage is configured in environments
         # for stage_name, stage_config in self.data["jobs"].items():
         #     self.data["jobs"][stage_name]["if"] = False if len(stage_config.get("steps", [])) <= 1 else True
-        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
-        with open(self.filename, "w") as fp:
-            self.yaml.dump(self.data, fp)
+        buffer = io.StringIO()
+        with tracer.span("yaml_dump", category="yaml", file=self.filename):
+            self.yaml.dump(self.data, buffer)
+        content = buffer.getvalue()
+        if path_exists(self.filename) and self._is_same_workflow(read_text(self.filename), content):
+            plan = Plan.current()
+            if plan is not None:
+                plan.skip(self.filename, "unchanged")
+            tracer.count("workflows_unchanged")
+            return False
+        return write_text(self.filename, content)
+
+    @classmethod
+    def _is_same_workflow(cls, old_content: str, new_content: str) -> bool:
+        if old_content == new_content:
+            return True
+        fast_backend = get_backend("fast")
+        try:
+            return fast_backend.load(old_content) == fast_backend.load(new_content)
+        except YAMLError:
+            return False  # Existed file is not a valid YAML
 
     def get_stage_job(self, stage_name: str):
         return self.data.mlget(["jobs", stage_name], self.yaml.map(), list_ok=True)
 
-    def merge_stage(self, stage_name: str, workflow):
+    def reindex(self):
+        """Rebuild stage order and step id indexes
+
+        Must be called when jobs or steps are modified without going through merge methods
+        """
+        self._stage_names = list(self.data.get("jobs", None) or [])
+        self._stage_positions = {stage_name: i for i, stage_name in enumerate(self._stage_names)}
+        self._step_ids = {}
+
+    def _get_stage_positions(self) -> dict:
+        if self._stage_names is None or len(self._stage_names) != len(self.data["jobs"]):
+            self.reindex()
+        return self._stage_positions
+
+    def _get_step_ids(self, stage_name: str, steps: list) -> set:
+        self._get_stage_positions()
+        step_ids = self._step_ids.get(stage_name)
+        if step_ids is None:
+            step_ids = {step["id"] for step in steps if "id" in step}
+            self._step_ids[stage_name] = step_ids
+        return step_ids
+
+    def merge_stage(self, stage_name: str, workflow, replace: bool = False) -> int:
         """Merge steps of a stage from another workflow
 
         Args:
             stage_name(str): stage_name to merge
             workflow: workflow
+            replace (bool): replace existed steps by the steps of the same id, existed steps are kept otherwise
+
+        Returns:
+            Number of merged steps
         """
         current_stage_job = self.get_stage_job(stage_name)
         existed_keys = list(current_stage_job)
-        existed_step_ids = [step["id"] for step in current_stage_job.get("steps", []) if "id" in step]
+        existed_step_ids = self._get_step_ids(stage_name, current_stage_job.get("steps", []))
         to_merge_stage_job = workflow.get_stage_job(stage_name)
         to_merge_steps = to_merge_stage_job.pop("steps", self.yaml.seq())
         for existed_key in existed_keys:
             to_merge_stage_job.pop(existed_key, None)
         current_steps = current_stage_job.pop("steps", self.yaml.seq())
+        replaced_steps = 0
+        if replace:
+            new_steps = {step["id"]: step for step in to_merge_steps if step.get("id", "") in existed_step_ids}
+            for i, step in enumerate(current_steps):
+                if step.get("id", "") in new_steps and step != new_steps[step["id"]]:
+                    current_steps[i] = new_steps[step["id"]]
+                    replaced_steps += 1
         to_merge_steps = self.yaml.seq([step for step in to_merge_steps if step.get("id", "") not in existed_step_ids])
+        existed_step_ids.update(step["id"] for step in to_merge_steps if "id" in step)
         current_steps.extend(to_merge_steps)
         self.data["jobs"][stage_name].update(to_merge_stage_job)
         self.data["jobs"][stage_name]["steps"] = current_steps
         # Add an empty line
-        if to_merge_steps:
-            stage_names = list(self.data["jobs"])
-            current_stage_index = stage_names.index(stage_name)
-            if stage_name != stage_names[-1]:
-                next_stage_name = stage_names[current_stage_index + 1]
-                self.data["jobs"].yaml_set_comment_before_after_key(next_stage_name, before="\n")
+        if to_merge_steps or replaced_steps:
+            stage_positions = self._get_stage_positions()
+            current_stage_index = stage_positions[stage_name]
+            if current_stage_index + 1 < len(self._stage_names):
+                next_stage_name = self._stage_names[current_stage_index + 1]
+                next_stage_comment = self.data["jobs"].ca.items.get(next_stage_name)
+                if not next_stage_comment or not next_stage_comment[1]:  # Only one empty line when merged again
+                    self.data["jobs"].yaml_set_comment_before_after_key(next_stage_name, before="\n")
+        return len(to_merge_steps) + replaced_steps
+
+    def merge_workflow(self, workflow, stages: list = None, replace: bool = False) -> int:
+        """Merge steps of several stages from another workflow
+
+        Args:
+            workflow: workflow
+            stages (list): stage names to merge, default to all stages of the current workflow
+            replace (bool): replace existed steps by the steps of the same id
+
+        Returns:
+            Number of merged steps
+        """
+        stages = list(self.data["jobs"]) if stages is None else stages
+        return sum(self.merge_stage(stage_name=stage_name, workflow=workflow, replace=replace) for stage_name in stages)
@@ -0,0 +1,211 @@
+import collections
+import copy
+import functools
+import threading
+
+
+class TriggerCompiler:
+    """Compile ``match_event`` / ``match_branch`` of landscape environments into GitHub Actions ``on:`` filters
+
+    ``match_branch`` is a regular expression of Git references. Alternations and groups are expanded, then each
+    alternative is translated into a GitHub filter pattern:
+
+    * ``refs/heads/(main|release/.*)`` gives ``{"push": {"branches": ["main", "release/**"]}}``
+    * ``refs/tags/v[0-9]+\\.[0-9]+\\.[0-9]+`` gives ``{"push": {"tags": ["v[0-9]+.[0-9]+.[0-9]+"]}}``
+    * ``.*`` gives ``{"push": {"branches": "**", "tags": "*"}}``
+
+    Expressions without GitHub filter equivalent (lone ``.``, ``x*``, ``{m,n}``...) and alternatives not starting
+    with ``refs/heads/`` or ``refs/tags/`` (a bare ``main`` doesn't match any Git reference) raise ``ValueError``.
+    """
+    branch_prefix = "refs/heads/"
+    tag_prefix = "refs/tags/"
+    max_alternatives = 256
+    glob_specials = "*?+[]"
+    escape_classes = {"d": "[0-9]", "w": "[a-zA-Z0-9_]"}
+    max_landscapes = 64
+    _landscapes = collections.OrderedDict()  # Compiled environments by landscape triggers, least recent first
+    _landscapes_lock = threading.Lock()
+
+    @classmethod
+    def _parse_alternation(cls, pattern: str, pos: int, in_group: bool):
+        alternatives, current = [], [""]
+        while pos < len(pattern):
+            char = pattern[pos]
+            if char == "\\":
+                current = [prefix + pattern[pos:pos + 2] for prefix in current]
+                pos += 2
+            elif char == "[":
+                end = pattern.find("]", pos + 2 if pattern[pos + 1:pos + 2] in ("]", "^") else pos + 1)
+                if end < 0:
+                    raise ValueError(f"Unterminated character class in {pattern}")
+                current = [prefix + pattern[pos:end + 1] for prefix in current]
+                pos = end + 1
+            elif char == "(":
+                pos += 3 if pattern.startswith("?:", pos + 1) else 1
+                group, pos = cls._parse_alternation(pattern, pos, True)
+                if pos < len(pattern) and pattern[pos] in "*+?{":
+                    raise ValueError(f"Quantified group is not supported in {pattern}")
+                current = [prefix + item for prefix in current for item in group]
+            elif char == ")":
+                if not in_group:
+                    raise ValueError(f"Unbalanced parenthesis in {pattern}")
+                return alternatives + current, pos + 1
+            elif char == "|":
+                alternatives.extend(current)
+                current = [""]
+                pos += 1
+            else:
+                current = [prefix + char for prefix in current]
+                pos += 1
+            if len(alternatives) + len(current) > cls.max_alternatives:
+                raise ValueError(f"Too many alternatives in {pattern}")
+        if in_group:
+            raise ValueError(f"Unbalanced parenthesis in {pattern}")
+        return alternatives + current, pos
+
+    @classmethod
+    def expand(cls, pattern: str) -> list:
+        """Expand groups and alternations of a regular expression
+
+        Args:
+            pattern (str): regular expression
+
+        Returns:
+            list of alternatives without group, anchors are removed
+        """
+        alternatives, _ = cls._parse_alternation(pattern, 0, False)
+        results = []
+        for alternative in alternatives:
+            alternative = alternative[1:] if alternative.startswith("^") else alternative
+            alternative = alternative[:-1] if alternative.endswith("$") and not alternative.endswith("\\$") \
+                else alternative
+            if alternative not in results:
+                results.append(alternative)
+        return results
+
+    @classmethod
+    def to_glob(cls, pattern: str) -> str:
+        """Translate a regular expression without group into a GitHub filter pattern
+
+        Args:
+            pattern (str): regular expression
+
+        Returns:
+            GitHub filter pattern
+        """
+        glob, pos, quantifiable = "", 0, False
+        while pos < len(pattern):
+            char = pattern[pos]
+            next_char = pattern[pos + 1:pos + 2]
+            if pattern.startswith("[^/]", pos) and pattern[pos + 4:pos + 5] in ("*", "+"):
+                glob, pos, quantifiable = glob + "*", pos + 5, False
+            elif char == "." and next_char in ("*", "+"):
+                glob, pos, quantifiable = glob + "**", pos + 2, False
+            elif char == ".":
+                raise ValueError(f"Single character wildcard is not supported in {pattern}")
+            elif char == "[":
+                if next_char == "^":
+                    raise ValueError(f"Negated character class is not supported in {pattern}")
+                end = pattern.index("]", pos + 2 if next_char == "]" else pos + 1)
+                glob, pos, quantifiable = glob + pattern[pos:end + 1], end + 1, True
+            elif char == "\\":
+                if next_char in cls.escape_classes:
+                    glob, quantifiable = glob + cls.escape_classes[next_char], True
+                elif next_char.isalnum():
+                    raise ValueError(f"Escape sequence \\{next_char} is not supported in {pattern}")
+                else:
+                    literal = "\\" + next_char if next_char in cls.glob_specials else next_char
+                    glob, quantifiable = glob + literal, True
+                pos += 2
+            elif char in "+?":
+                if not quantifiable:
+                    raise ValueError(f"Nothing to repeat at position {pos} in {pattern}")
+                glob, pos, quantifiable = glob + char, pos + 1, False
+            elif char in "*{":
+                raise ValueError(f"Quantifier {char} is not supported in {pattern}")
+            else:
+                glob, pos, quantifiable = glob + ("\\" + char if char == "!" and not glob else char), pos + 1, True
+        return glob
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def _compile_pattern(cls, pattern: str) -> dict:
+        if pattern in (".*", "^.*$"):
+            return {"push": {"branches": "**", "tags": "*"}}
+        filters = {"branches": [], "tags": []}
+        for alternative in cls.expand(pattern):
+            for filter_name, prefix in [("branches", cls.branch_prefix), ("tags", cls.tag_prefix)]:
+                if alternative.startswith(prefix):
+                    ref_pattern = alternative[len(prefix):]
+                    if ref_pattern == ".*":
+                        glob = "**" if filter_name == "branches" else "*"
+                    else:
+                        glob = cls.to_glob(ref_pattern)
+                    if glob not in filters[filter_name]:
+                        filters[filter_name].append(glob)
+                    break
+            else:
+                raise ValueError(f"{alternative} must start with {cls.branch_prefix} or {cls.tag_prefix}")
+        return {"push": {key: value for key, value in filters.items() if value}}
+
+    @classmethod
+    def compile_pattern(cls, pattern: str) -> dict:
+        """Compile a ``match_branch`` regular expression into push filters
+
+        Args:
+            pattern (str): regular expression of Git references
+
+        Returns:
+            ``on:`` configuration of push event
+        """
+        return copy.deepcopy(cls._compile_pattern(pattern))
+
+    @classmethod
+    def compile_trigger(cls, match_event: str = "push", match_branch: str = ".*") -> dict:
+        """Compile the trigger of an environment
+
+        Args:
+            match_event (str): ``push``, ``pull_request`` or ``release``
+            match_branch (str): regular expression of Git references
+
+        Returns:
+            ``on:`` configuration of the workflow
+        """
+        if match_event == "release":
+            return {"release": {"types": "published"}}
+        elif match_event == "push":
+            return cls.compile_pattern(match_branch)
+        elif match_event == "pull_request":
+            filters = cls.compile_pattern(match_branch)["push"]
+            if isinstance(filters.get("tags"), list):
+                raise ValueError(f"Pull request trigger doesn't accept tag patterns: {match_branch}")
+            branches = filters.get("branches")
+            return {"pull_request": {} if branches is None else {"branches": branches}}
+        raise ValueError(f"{match_event} doesn't exist")
+
+    @classmethod
+    def compile_landscape(cls, environments: dict) -> dict:
+        """Compile triggers of all environments of a landscape, memoized by their ``match_event`` / ``match_branch``
+
+        The result is shared between calls with the same triggers, it must not be modified.
+
+        Args:
+            environments (dict): environment name -> environment configuration
+
+        Returns:
+            Dictionary of environment name -> ``on:`` configuration
+        """
+        key = tuple((env_name, (env_config or {}).get("match_event", "push"),
+                     (env_config or {}).get("match_branch", ".*")) for env_name, env_config in environments.items())
+        with cls._landscapes_lock:
+            compiled = cls._landscapes.get(key)
+            if compiled is not None:
+                cls._landscapes.move_to_end(key)
+                return compiled
+        compiled = {env_name: cls.compile_trigger(match_event, match_branch)
+                    for env_name, match_event, match_branch in key}
+        with cls._landscapes_lock:
+            cls._landscapes[key] = compiled
+            while len(cls._landscapes) > cls.max_landscapes:
+                cls._landscapes.popitem(last=False)
+        return compiled
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+FICLONE = 0x40049409  # Linux ioctl to share file extents (reflink)
+
+
+class CopyResult:
+    """Result of a directory copy
+
+    Attributes:
+        copied (list): target files written
+        skipped (list): target files already existed and kept untouched
+        unchanged (list): target files whose source didn't change since last copy
+    """
+    def __init__(self):
+        self.copied = []
+        self.skipped = []
+        self.unchanged = []
+
+    def __repr__(self):
+        return (f"CopyResult(copied={len(self.copied)}, skipped={len(self.skipped)}, "
+                f"unchanged={len(self.unchanged)})")
+
+
+class CopyManifest:
+    """Manifest of copied files, keeping source signature of each target file
+
+    Each entry is saved as target path -> {"source", "size", "mtime", "hash"}
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.entries = {}
+        self.changed = False
+        if os.path.exists(filename):
+            with open(filename) as fp:
+                self.entries = json.load(fp)
+
+    @classmethod
+    def get_hash(cls, filename: str) -> str:
+        digest = hashlib.sha256()
+        with open(filename, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_unchanged(self, source_file: str, target_file: str, source_stat: os.stat_result) -> bool:
+        """Check if the source file is the same as the one copied to target
+
+        Args:
+            source_file (str): source file path
+            target_file (str): target file path
+            source_stat (os.stat_result): stat of source file
+
+        Returns:
+            True if the source file has the same content since the last copy
+        """
+        entry = self.entries.get(target_file)
+        if entry is None or entry["source"] != source_file or entry["size"] != source_stat.st_size:
+            return False
+        if entry["mtime"] == source_stat.st_mtime_ns:
+            return True
+        if entry["hash"] == self.get_hash(source_file):
+            # Touched but not modified
+            entry["mtime"] = source_stat.st_mtime_ns
+            self.changed = True
+            return True
+        return False
+
+    def record(self, source_file: str, target_file: str, source_stat: os.stat_result):
+        self.entries[target_file] = {
+            "source": source_file,
+            "size": source_stat.st_size,
+            "mtime": source_stat.st_mtime_ns,
+            "hash": self.get_hash(source_file),
+        }
+        self.changed = True
+
+    def dumps(self) -> str:
+        return json.dumps(self.entries, indent=2, sort_keys=True)
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        with open(self.filename, "w") as fp:
+            fp.write(self.dumps())
+        self.changed = False
+
+
+def _reflink(source_file: str, target_file: str):
+    if not sys.platform.startswith("linux"):
+        raise OSError("Reflink is only supported on Linux")
+    import fcntl
+    with open(source_file, "rb") as source_fp, open(target_file, "wb") as target_fp:
+        fcntl.ioctl(target_fp.fileno(), FICLONE, source_fp.fileno())
+    shutil.copystat(source_file, target_file)
+
+
+def copy_file(source_file: str, target_file: str, strategy: str = "copy"):
+    """Copy a file with the given strategy
+
+    Args:
+        source_file (str): source file path
+        target_file (str): target file path
+        strategy (str): ``copy``, ``hardlink`` or ``reflink``. Fallback to ``copy`` when not supported.
+    """
+    if strategy not in ("copy", "hardlink", "reflink"):
+        raise ValueError(f"Copy strategy {strategy} doesn't exist")
+    if os.path.lexists(target_file) and (strategy != "copy" or os.stat(target_file).st_nlink > 1):
+        # Never write through a hardlink, it would change the source file
+        os.remove(target_file)
+    try:
+        if strategy == "hardlink":
+            os.link(source_file, target_file)
+            return
+        elif strategy == "reflink":
+            _reflink(source_file, target_file)
+            return
+    except OSError:
+        if os.path.lexists(target_file):
+            os.remove(target_file)
+    shutil.copy2(source_file, target_file)
@@ -1,11 +1,29 @@
+import asyncio
+import contextlib
 import copy
+import functools
+import hashlib
+import io
 import os
+import re
 import sys
 import shutil
 import subprocess
-import yaml
-from jinja2 import Environment, FileSystemLoader
-from xia_module.cicd.github import GitHubWorkflow
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, TemplateError
+from xia_module.cicd.assembler import WorkflowAssembler
+from xia_module.cicd.trigger import TriggerCompiler
+from xia_module.cache import parse_cache, get_cache_dir
+from xia_module.yaml_backend import get_backend
+from xia_module.copier import CopyResult, CopyManifest, copy_file
+from xia_module.staging import GitStaging
+from xia_module.tracing import tracer
+from xia_module.runner import CommandRunner
+from xia_module.sharder import ConfigSharder
+from xia_module.plan import Plan, path_exists, read_text, write_text
+from xia_module.terraform import TerraformIndex
 
 
 class Module:
@@ -13,6 +31,11 @@ class Module:
     cicd_stages = ["test-local", "build", "deploy", "test-remote", "publish"]
     activate_depends = []  # Those modules must be activated before this module
     deploy_depends = []  # Those modules must be deployed before this module
+    template_workers = 8  # Number of threads to render templates
+    _template_envs = {}  # Jinja2 environments by template directory
+    _template_envs_lock = threading.Lock()
+    _bytecode_cache = None
+    _workflow_lock = threading.Lock()
 
     def __init__(self, source_dir: str = "", **kwargs):
         package_dir = os.path.dirname(os.path.abspath(sys.modules[self.__class__.__module__].__file__))
@@ -26,53 +49,141 @@ class Module:
         self.template_dir = os.path.join(package_dir, "templates", self.module_name, "template")
         self.cicd_dir = os.path.join(package_dir, "templates", self.module_name, "cicd")
         self.config_dir = os.path.join(package_dir, "templates", self.module_name, "config")
-        self.env = Environment(
-            loader=FileSystemLoader(searchpath=self.template_dir),
-            trim_blocks=True,
-            keep_trailing_newline=True
-        )
+        self.env = self.get_template_env(self.template_dir)
 
     @classmethod
-    def _config_replace(cls, file_path: str, replace_dict: dict):
+    def get_template_env(cls, template_dir: str) -> Environment:
+        """Get the Jinja2 environment of a template directory, shared by all instances
+
+        Compiled templates are kept in a bytecode cache shared by all processes
+
+        Args:
+            template_dir (str): template directory
+
+        Returns:
+            Jinja2 environment
+        """
+        with cls._template_envs_lock:
+            if template_dir not in cls._template_envs:
+                if cls._bytecode_cache is None:
+                    try:
+                        bytecode_cache_dir = get_cache_dir("jinja2")
+                        os.makedirs(bytecode_cache_dir, exist_ok=True)
+                        Module._bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+                    except OSError:
+                        print("Template bytecode cache directory cannot be created, skip")
+                cls._template_envs[template_dir] = Environment(
+                    loader=FileSystemLoader(searchpath=template_dir),
+                    trim_blocks=True,
+                    keep_trailing_newline=True,
+                    bytecode_cache=cls._bytecode_cache
+                )
+            return cls._template_envs[template_dir]
+
+    @classmethod
+    @functools.lru_cache(maxsize=64)
+    def _compile_replace_keys(cls, key_words: tuple):
+        """Compile keywords into a prefix matcher, the first keyword in order wins like a sequential check
+
+        Args:
+            key_words (tuple): keywords
+
+        Returns:
+            Compiled regular expression, matched text is the keyword
+        """
+        return re.compile("|".join(re.escape(key_word) for key_word in key_words))
+
+    @classmethod
+    def _replace_lines(cls, lines, replace_dict: dict, output) -> int:
+        matcher = cls._compile_replace_keys(tuple(replace_dict))
+        replaced = 0
+        for line in lines:
+            stripped_line = line.strip()
+            if stripped_line.startswith("#"):
+                matched = matcher.match(stripped_line[1:].strip())
+                if matched is not None:
+                    output.write(replace_dict[matched.group(0)])
+                    replaced += 1
+                    continue
+            output.write(line)
+        return replaced
+
+    @classmethod
+    def _config_replace(cls, file_path: str, replace_dict: dict) -> bool:
         """Configuration file line replace
 
+        The file is streamed into a temporary file which replaces the original one only if a line is replaced
+
         Args:
             file_path: file path of the file to be replaced
             replace_dict: replacement dictionary (example {"key:", "key: value"})
+
+        Returns:
+            True if the file is changed
         """
-        if not os.path.isfile(file_path):
+        if not path_exists(file_path):
             print(f"File {file_path} doesn't exist, skip")
-            return
-        with open(file_path) as config_file:
-            lines = config_file.readlines()
-        new_lines = []
-        for line in lines:
-            stripped_line = line.strip()
-            if not stripped_line.startswith("#"):
-                new_lines.append(line)
-                continue
-            stripped_line = stripped_line[1:].strip()
-            key_word_found = False
-            for key_word, new_content in replace_dict.items():
-                if stripped_line.startswith(key_word):
-                    new_lines.append(new_content)
-                    key_word_found = True
-                    break
-            if not key_word_found:
-                new_lines.append(line)
-        with open(file_path, "w") as config_file:
-            config_file.writelines(new_lines)
+            return False
+        if not replace_dict:
+            return False
+        plan = Plan.current()
+        if plan is not None:
+            output = io.StringIO()
+            if cls._replace_lines(io.StringIO(read_text(file_path)), replace_dict, output) == 0:
+                plan.skip(file_path, "unchanged")
+                return False
+            return plan.write(file_path, output.getvalue())
+        target_dir = os.path.dirname(os.path.abspath(file_path))
+        with open(file_path) as config_file, \
+                tempfile.NamedTemporaryFile("w", dir=target_dir, suffix=".tmp", delete=False) as temp_file:
+            try:
+                replaced = cls._replace_lines(config_file, replace_dict, temp_file)
+            except Exception:
+                temp_file.close()
+                os.remove(temp_file.name)
+                raise
+        if replaced == 0:
+            os.remove(temp_file.name)
+            return False
+        shutil.copymode(file_path, temp_file.name)
+        os.replace(temp_file.name, file_path)
+        return True
+
+    @classmethod
+    def config_replace_batch(cls, replace_jobs, max_workers: int = 4) -> dict:
+        """Configuration file line replace of several files concurrently
+
+        Args:
+            replace_jobs: iterable of (file path, replacement dictionary). Jobs of the same file run in order.
+            max_workers (int): Maximum files processed at the same time
+
+        Returns:
+            dictionary of file path -> True if the file is changed
+        """
+        jobs_by_file = {}
+        for file_path, replace_dict in replace_jobs:
+            jobs_by_file.setdefault(file_path, []).append(replace_dict)
+
+        plan = Plan.current()
+
+        def replace_file(file_path: str):
+            with plan.bind() if plan is not None else contextlib.nullcontext():
+                return any([cls._config_replace(file_path, replace_dict) for replace_dict in jobs_by_file[file_path]])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(jobs_by_file, executor.map(replace_file, jobs_by_file)))
 
     def get_config_file_path(self):
-        config_file, config_dir = None, None
-        main_module_file = f"./iac/environments/base/{self.module_name}.tf"
-        if os.path.exists(main_module_file):
-            with open(main_module_file) as fp:
-                for line in fp.readlines():
-                    if line.strip().startswith("config_file"):
-                        config_file = "./" + line.strip().split("../../../")[-1][:-1]
-                    elif line.strip().startswith("config_dir"):
-                        config_dir = "./" + line.strip().split("../../../")[-1][:-1]
+        """Get configuration file and directory of the module from its base Terraform file
+
+        Returns:
+            configuration file path and configuration directory path relative to the application root
+        """
+        base_index = TerraformIndex.load(os.path.join(".", "iac", "environments", "base"))
+        config_file = base_index.find_attribute(f"{self.module_name}.tf", "config_file")
+        config_dir = base_index.find_attribute(f"{self.module_name}.tf", "config_dir")
+        config_file = None if config_file is None else "./" + config_file.split("../../../")[-1]
+        config_dir = None if config_dir is None else "./" + config_dir.split("../../../")[-1]
         return config_file, config_dir
 
     def init_config(self, repo_dict: dict = None, var_dict: dict = None, **kwargs):
@@ -86,89 +197,293 @@ class Module:
 
     @classmethod
     def git_add(cls, filename: str):
-        if os.path.exists(filename):
-            subprocess.run(['git', 'add', filename], check=True)
+        """Add a file to Git, deferred to the end of the current staging session if any
+
+        Args:
+            filename (str): file path to be added
+        """
+        plan = Plan.current()
+        if plan is not None:
+            plan.stage(filename)
+        elif os.path.exists(filename):
+            staging = GitStaging.current()
+            if staging is not None:
+                staging.add(filename)
+            else:
+                with tracer.span("git_add", category="git", files=1):
+                    subprocess.run(['git', 'add', filename], check=True)
+                tracer.count("files_staged")
         else:
             raise ValueError(f"{filename} doesn't exist, cannot add to Git")
 
+    @classmethod
+    def _copy_file(cls, source_file: str, target_file: str, strategy: str = "copy"):
+        plan = Plan.current()
+        if plan is not None:
+            plan.copy(source_file, target_file, strategy)
+        elif strategy == "copy":
+            shutil.copy(source_file, target_file)
+        else:
+            copy_file(source_file, target_file, strategy)
+
+    @classmethod
+    def _copy_tree(cls, source_dir: str, target_dir: str, strategy: str = "copy"):
+        plan = Plan.current()
+        if plan is not None:
+            for root, dirs, files in os.walk(source_dir):
+                for file_name in files:
+                    source_file = os.path.join(root, file_name)
+                    target_file = os.path.join(target_dir, os.path.relpath(source_file, source_dir))
+                    plan.copy(source_file, target_file, strategy)
+        elif strategy == "copy":
+            shutil.copytree(source_dir, target_dir)
+        else:
+            shutil.copytree(source_dir, target_dir, copy_function=lambda src, dst: copy_file(src, dst, strategy))
+
     def enable(self, module_dir: str = os.path.sep.join(["iac", "modules"]),
-               base_dir: str = os.path.sep.join(["iac", "environments", "base"]), **kwargs):
+               base_dir: str = os.path.sep.join(["iac", "environments", "base"]), strategy: str = "copy", **kwargs):
         """Enable a module
 
         Args:
             module_dir (str): Target Terraform Module Directory
             base_dir (str): Target Terraform Base Directory
+            strategy (str): ``copy``, ``hardlink`` or ``reflink``. Hardlinked files share content with the installed
+                package, they must not be edited in place
         """
-        target_module_dir = os.path.sep.join([module_dir, self.module_name])
-        if os.path.exists(target_module_dir):
-            print(f"Found local module {self.module_name}")
-        elif not os.path.exists(self.module_dir):
-            print(f"No module directory defined-{self.module_name}, skip")
-        else:
-            shutil.copytree(self.module_dir, target_module_dir)
-            print(f"Global module {self.module_name} loaded")
-        target_base_file = os.path.sep.join([base_dir, self.module_name + ".tf"])
-        if os.path.exists(target_base_file):
-            print(f"Found local base file {target_base_file}")
-        elif not os.path.exists(self.base_file):
-            print(f"No base file defined-{self.module_name}, skip")
-        else:
-            shutil.copy(self.base_file, target_base_file)
-            print(f"Global base file {target_base_file} loaded")
+        with tracer.span("enable", module=self.module_name):
+            target_module_dir = os.path.sep.join([module_dir, self.module_name])
+            if os.path.exists(target_module_dir):
+                print(f"Found local module {self.module_name}")
+            elif not os.path.exists(self.module_dir):
+                print(f"No module directory defined-{self.module_name}, skip")
+            else:
+                self._copy_tree(self.module_dir, target_module_dir, strategy)
+                print(f"Global module {self.module_name} loaded")
+            target_base_file = os.path.sep.join([base_dir, self.module_name + ".tf"])
+            if os.path.exists(target_base_file):
+                print(f"Found local base file {target_base_file}")
+            elif not os.path.exists(self.base_file):
+                print(f"No base file defined-{self.module_name}, skip")
+            else:
+                self._copy_file(self.base_file, target_base_file, strategy)
+                print(f"Global base file {target_base_file} loaded")
 
     def activate(self, module_dir: str = os.path.sep.join(["iac", "modules"]),
-                 base_dir: str = os.path.sep.join(["iac", "environments", "base"]), **kwargs):
+                 base_dir: str = os.path.sep.join(["iac", "environments", "base"]), strategy: str = "copy", **kwargs):
         """Activate a module in a foundation
 
         Args:
             module_dir (str): Target Terraform Module Directory
             base_dir (str): Target Terraform Base Directory
+            strategy (str): ``copy``, ``hardlink`` or ``reflink``
         """
-        target_module_dir = os.path.sep.join([module_dir, "activate-" + self.module_name])
-        if os.path.exists(target_module_dir):
-            print(f"Found local module activate-{self.module_name}")
-        elif not os.path.exists(self.activate_dir):
-            print(f"No activate module directory defined-{self.module_name}, skip")
-        else:
-            shutil.copytree(self.activate_dir, target_module_dir)
-            print(f"Global module activate-{self.module_name} loaded")
-        target_file = os.path.sep.join([base_dir, "activate_" + self.module_name + ".tf"])
-        if os.path.exists(target_file):
-            print(f"Found local activate file {target_file}")
-        elif not os.path.exists(self.activate_file):
-            print(f"No activate file defined-{self.module_name}, skip")
-        else:
-            shutil.copy(self.activate_file, target_file)
-            print(f"Global activate file {target_file} loaded")
+        with tracer.span("activate", module=self.module_name):
+            target_module_dir = os.path.sep.join([module_dir, "activate-" + self.module_name])
+            if os.path.exists(target_module_dir):
+                print(f"Found local module activate-{self.module_name}")
+            elif not os.path.exists(self.activate_dir):
+                print(f"No activate module directory defined-{self.module_name}, skip")
+            else:
+                self._copy_tree(self.activate_dir, target_module_dir, strategy)
+                print(f"Global module activate-{self.module_name} loaded")
+            target_file = os.path.sep.join([base_dir, "activate_" + self.module_name + ".tf"])
+            if os.path.exists(target_file):
+                print(f"Found local activate file {target_file}")
+            elif not os.path.exists(self.activate_file):
+                print(f"No activate file defined-{self.module_name}, skip")
+            else:
+                self._copy_file(self.activate_file, target_file, strategy)
+                print(f"Global activate file {target_file} loaded")
 
     @classmethod
-    def copy_dir(cls, source_dir, target_dir, overwrite: bool = False, git_add: bool = False):
+    def get_manifest_file(cls):
+        return os.path.join(".", ".xia", "manifests", f"{cls.module_name}.json")
+
+    @classmethod
+    def copy_dir(cls, source_dir, target_dir, overwrite: bool = False, git_add: bool = False,
+                 incremental: bool = False, strategy: str = "copy") -> CopyResult:
+        """Copy a directory
+
+        Args:
+            source_dir (str): Source directory
+            target_dir (str): Target directory
+            overwrite (bool): Overwrite existed files
+            git_add (bool): Add copied files to Git
+            incremental (bool): Only copy files whose source changed since last copy (tracked by module manifest).
+                Targets recorded in the manifest are overwritten when their source changes, even without
+                ``overwrite``, unless they were edited since the last copy. Other existing targets follow ``overwrite``
+            strategy (str): ``copy``, ``hardlink`` or ``reflink``
+
+        Returns:
+            Copy result with copied, skipped and unchanged files
+        """
+        with tracer.span("copy_dir", module=cls.module_name, source_dir=source_dir, target_dir=target_dir):
+            result = cls._copy_dir(source_dir, target_dir, overwrite, git_add, incremental, strategy)
+        tracer.count("files_copied", len(result.copied))
+        tracer.count("files_skipped", len(result.skipped))
+        tracer.count("files_unchanged", len(result.unchanged))
+        return result
+
+    @classmethod
+    def _copy_dir(cls, source_dir, target_dir, overwrite: bool, git_add: bool, incremental: bool, strategy: str):
+        result = CopyResult()
         if not os.path.exists(source_dir):
             print("Source directory not found, skip")
+            return result
+        manifest = CopyManifest(cls.get_manifest_file()) if incremental else None
+        plan = Plan.current()
+        if plan is None:
+            os.makedirs(target_dir, exist_ok=True)
         for root, dirs, files in os.walk(source_dir):
             # Create corresponding subdirectories in the destination directory
             for dir_name in dirs:
                 source_subdir = os.path.join(root, dir_name)
                 target_subdir = os.path.join(target_dir, os.path.relpath(source_subdir, source_dir))
-                os.makedirs(target_subdir, exist_ok=True)
+                if plan is None:
+                    os.makedirs(target_subdir, exist_ok=True)
             # Copy files to the destination directory
             for file_name in files:
                 source_file = os.path.join(root, file_name)
                 target_file = os.path.join(target_dir, os.path.relpath(source_file, source_dir))
-                if overwrite or not os.path.exists(target_file):
-                    shutil.copy2(source_file, target_file)
+                target_exists = path_exists(target_file)
+                if manifest is not None and target_exists:
+                    source_stat = os.stat(source_file)
+                    if manifest.is_unchanged(source_file, target_file, source_stat):
+                        if plan is not None:
+                            plan.skip(target_file, "unchanged")
+                        result.unchanged.append(target_file)
+                        continue
+                tracked = manifest is not None and target_file in manifest.entries
+                if tracked and target_exists and not overwrite:
+                    # Copied targets follow their source unless they are edited since the last copy
+                    target_hash = CopyManifest.get_hash(target_file) if plan is None else \
+                        cls._get_target_hash(target_file)
+                    tracked = target_hash in (manifest.entries[target_file]["hash"], CopyManifest.get_hash(source_file))
+                if overwrite or tracked or not target_exists:
+                    if plan is not None:
+                        plan.copy(source_file, target_file, strategy)
+                    else:
+                        copy_file(source_file, target_file, strategy)
+                    if manifest is not None:
+                        manifest.record(source_file, target_file, os.stat(source_file))
                     if git_add:
                         cls.git_add(target_file)
+                    result.copied.append(target_file)
                     print(f"Copied: {source_file} -> {target_file}")
                 else:
+                    if plan is not None:
+                        plan.skip(target_file)
+                    result.skipped.append(target_file)
                     print(f"Skip existed file: {target_file}")
+        if manifest is not None and plan is not None:
+            if manifest.changed:
+                plan.write(manifest.filename, manifest.dumps())
+        elif manifest is not None:
+            manifest.save()
+        return result
+
+    def _render_template(self, template_name: str, context: dict):
+        """Render a template, files which are not text are returned as bytes to be copied as-is
+
+        Returns:
+            template name, content and render error if any
+        """
+        with tracer.span("render_template", module=self.module_name, template=template_name):
+            try:
+                return template_name, self.env.get_template(template_name).render(**context), None
+            except UnicodeDecodeError:
+                with open(os.path.join(self.template_dir, *template_name.split("/")), "rb") as fp:
+                    return template_name, fp.read(), None
+            except TemplateError as e:
+                return template_name, None, e
+
+    @classmethod
+    def _get_target_hash(cls, target_file: str) -> str:
+        try:
+            content = read_text(target_file)
+        except UnicodeDecodeError:
+            content = None
+        return CopyManifest.get_hash(target_file) if content is None else \
+            hashlib.sha256(content.encode()).hexdigest()
+
+    def _write_rendered(self, manifest: CopyManifest, template_name: str, content) -> str:
+        """Write a rendered template, targets modified since last rendering are kept
+
+        Returns:
+            ``written``, ``unchanged`` or ``skipped``
+        """
+        target_file = os.path.join(".", *template_name.split("/"))
+        content_hash = hashlib.sha256(content.encode() if isinstance(content, str) else content).hexdigest()
+        if path_exists(target_file):
+            target_hash = self._get_target_hash(target_file)
+            entry = manifest.entries.get(target_file)
+            if target_hash == content_hash:
+                status = "unchanged"
+            elif entry is not None and entry["hash"] == target_hash:
+                status = "written"
+            else:
+                return "skipped"  # Not rendered by the module or edited since
+        else:
+            status = "written"
+        if status == "written":
+            if isinstance(content, str):
+                write_text(target_file, content, "render")
+            else:
+                self._copy_file(os.path.join(self.template_dir, *template_name.split("/")), target_file)
+        if manifest.entries.get(target_file) != {"source": template_name, "hash": content_hash}:
+            manifest.entries[target_file] = {"source": template_name, "hash": content_hash}
+            manifest.changed = True
+        return status
+
+    def get_template_manifest_file(self):
+        return os.path.join(".", ".xia", "manifests", f"{self.module_name}-templates.json")
 
     def _build_template(self, **kwargs):
         """Build From template directory
 
+        Each file of template directory is rendered into the application with the same relative path, files which
+        are not text are copied as-is. Existing targets are only overwritten if they were rendered by a previous
+        build and not edited since (tracked by the template manifest, staged with the rendered files). Targets whose
+        rendered content is unchanged are not written. Render errors are reported per file without stopping the build.
+
         Args:
-            **kwargs:
+            **kwargs: Template context
+
+        Returns:
+            Dictionary of template name -> render error
         """
+        if not os.path.exists(self.template_dir):
+            return {}
+        template_names = self.env.list_templates()
+        with ThreadPoolExecutor(max_workers=self.template_workers) as executor:
+            results = list(executor.map(lambda name: self._render_template(name, kwargs), template_names))
+        manifest = CopyManifest(self.get_template_manifest_file())
+        errors, written = {}, 0
+        for template_name, content, error in results:
+            target_file = os.path.join(".", *template_name.split("/"))
+            if error is not None:
+                errors[template_name] = error
+                print(f"Render failed: {template_name}: {error}")
+                continue
+            status = self._write_rendered(manifest, template_name, content)
+            if status == "written":
+                written += 1
+                self.git_add(target_file)
+                print(f"Rendered: {target_file}")
+            elif status == "unchanged":
+                print(f"Skip unchanged file: {target_file}")
+            else:
+                print(f"Skip modified file: {target_file}")
+        tracer.count("templates_rendered", written)
+        if manifest.changed:
+            plan = Plan.current()
+            if plan is not None:
+                plan.write(manifest.filename, manifest.dumps())
+            else:
+                manifest.save()
+            # Committed with the application, so edited targets are recognized in every checkout
+            self.git_add(manifest.filename)
+        return errors
 
     def _build_config(self, **kwargs):
         """Build From config directory
@@ -180,23 +495,7 @@ class Module:
 
     @classmethod
     def _regex_to_github_actions(cls, pattern: str):
-        tag_dict = {".*": ["*"]}
-        actions_config = {'on': {'push': {}}}
-
-        if pattern == ".*":
-            return {'on': {'push': {"branches": "**", "tags": "*"}}}
-
-        if pattern.startswith("refs/tags/"):
-            tag_pattern = pattern.replace("refs/tags/", "")
-            actions_config['on']['push']['tags'] = tag_dict[tag_pattern]
-        elif pattern.startswith("refs/heads/"):
-            branch_pattern = pattern.replace("refs/heads/", "")
-            if branch_pattern == ".*":
-                actions_config['on']['push']['branches'] = ["**"]
-            elif branch_pattern.startswith("(") and branch_pattern.endswith(")"):
-                branch_pattern = branch_pattern[1:-1]
-                actions_config['on']['push']['branches'] = branch_pattern.split("|")
-        return actions_config
+        return {"on": TriggerCompiler.compile_pattern(pattern)}
 
     def _upsert_cicd_github_global(self, env_name: str, **kwargs) -> dict:
         """Generate CICD
@@ -212,71 +511,176 @@ class Module:
         if os.path.exists(workflow_yaml):
             # Case 1: If exists, return the existed one
             with open(workflow_yaml, 'r') as file:
-                return yaml.safe_load(file) or {}
+                return get_backend(readonly=True).load(file) or {}
         else:
             # Case 2: If not exists, create a new one
             os.makedirs(os.path.join(".", ".github", "workflows"), exist_ok=True)
-            match_branch = kwargs.get("match_branch", "push")
+            match_branch = kwargs.get("match_branch", ".*")
             match_event = kwargs.get("match_event", "push")
-            if match_event == "release":
-                trigger_event = {"release": {"types": "published"}}
-            elif match_event == "push":
-                trigger_cfg = self._regex_to_github_actions(match_branch)
-                trigger_event = trigger_cfg.get("on", None)
-            else:
-                raise ValueError(f"{match_event} doesn't exist")
+            trigger_event = TriggerCompiler.compile_trigger(match_event, match_branch)
             workflow_config = {
                 "name": f"Workflow - {env_name}",
                 "on": trigger_event
             }
 
             with open(workflow_yaml, 'w') as file:
-                yaml.dump(workflow_config, file, default_flow_style=False, sort_keys=False)
+                get_backend(readonly=False).dump(workflow_config, file)
 
-    def _build_cicd(self, **kwargs):
-        """Build Pipeline files
+    @classmethod
+    def get_landscape_config(cls) -> dict:
+        landscape_yaml = os.path.join(".", "config", "landscape.yaml")
+        landscape_backend = get_backend(readonly=True)
+        return parse_cache.load(landscape_yaml, landscape_backend.load, landscape_backend.name) or {}
 
-        Args:
-            **kwargs:
+    def _build_cicd_actions(self):
+        """Copy action files of the module
         """
-        # Step 1: Get information
-        landscape_yaml = os.path.join(".", "config", "landscape.yaml")
-        with open(landscape_yaml, 'r') as file:
-            landscape_config = yaml.safe_load(file) or {}
-        cicd_engine = landscape_config.get("cicd", landscape_config.get("git", "github"))
-        # Step 2: Copy Action Files
         source_action_dir = os.path.join(self.cicd_dir, "github", "actions")
         target_action_dir = f".github/actions/{self.module_name}"
         self.copy_dir(source_action_dir, target_action_dir, git_add=True)
-        # Step 3: Need build environments
-        default_env_config = {"base": {"match_branch": "refs/tags/.*", "stages": self.cicd_stages}}
-        for env_name, env_config in landscape_config.get("environments", default_env_config).items():
-            if cicd_engine == "github":
-                gh_action_filename = f".github/workflows/workflow-{env_name}.yml"
-                gh_action = GitHubWorkflow(gh_action_filename, workflow_name="",
-                                           env_name=env_name, env_params=env_config)
-                module_gh_action_fn = os.path.join(self.cicd_dir, "github", "workflow.yml")
-                if os.path.exists(module_gh_action_fn):
-                    module_action = GitHubWorkflow(module_gh_action_fn)
-                    for stage_name in env_config.get("stages", []):
-                        gh_action.merge_stage(stage_name=stage_name, workflow=module_action)
-                    gh_action.dump()
-                    self.git_add(gh_action_filename)
-
-    def initialize(self, **kwargs):
+
+    @classmethod
+    def build_cicd_workflows(cls, modules: list, landscape_config: dict = None, refresh: bool = False,
+                             replace: bool = False) -> list:
+        """Build environment workflows of several modules, each workflow file is loaded and written once
+
+        Args:
+            modules (list): module instances in dependency order
+            landscape_config (dict): landscape configuration, loaded from ``config/landscape.yaml`` if not provided
+            refresh (bool): regenerate trigger and stage order of existed workflows from the landscape configuration
+            replace (bool): replace steps of existed workflows by module steps of the same id
+
+        Returns:
+            list of written workflow files, unchanged workflows are neither written nor staged
+        """
+        landscape_config = cls.get_landscape_config() if landscape_config is None else landscape_config
+        cicd_engine = landscape_config.get("cicd", landscape_config.get("git", "github"))
+        written_files = []
+        if cicd_engine == "github":
+            cicd_stages = modules[0].cicd_stages if modules else cls.cicd_stages
+            assembler = WorkflowAssembler(landscape_config, cicd_stages)
+            with Module._workflow_lock:  # Modules running in parallel share the same workflow files
+                written_files = assembler.assemble(modules, refresh, replace)
+                for workflow_file in written_files:
+                    cls.git_add(workflow_file)
+        return written_files
+
+    def _build_cicd(self, build_workflows: bool = True, **kwargs):
+        """Build Pipeline files
+
+        Args:
+            build_workflows (bool): Assemble environment workflows, action files are always copied
+            **kwargs:
+        """
+        # Step 1: Copy Action Files
+        self._build_cicd_actions()
+        # Step 2: Need build environments
+        if build_workflows:
+            self.build_cicd_workflows([self], self.get_landscape_config())
+
+    def initialize(self, build_workflows: bool = True, **kwargs):
         """Initialize a module in an application
+
+        All files to be added to Git are staged together at the end of initialization. Initialization stops after
+        the template build if any template fails to render, the other templates are rendered and staged.
+
+        Args:
+            build_workflows (bool): Assemble environment workflows. Disabled by callers assembling the workflows of
+                several modules at once (see ``ModuleOrchestrator.run``)
+            **kwargs: Template parameters, ``cicd`` and ``config`` parameters
+        """
+        with tracer.span("initialize", module=self.module_name), GitStaging():
+            with tracer.span("init", module=self.module_name):
+                self.copy_dir(self.init_dir, ".", overwrite=False, git_add=True)
+            template_params = copy.deepcopy(kwargs)
+            cicd_params = template_params.pop("cicd", {})
+            config_params = template_params.pop("config", {})
+            with tracer.span("build_template", module=self.module_name):
+                errors = self._build_template(**template_params)
+            if errors:
+                raise ValueError(f"Templates of {self.module_name} failed to render: {', '.join(sorted(errors))}")
+            with tracer.span("build_cicd", module=self.module_name):
+                self._build_cicd(build_workflows=build_workflows, **cicd_params)
+            with tracer.span("build_config", module=self.module_name):
+                self._build_config(**config_params)
+
+    def plan(self, action: str = "initialize", **kwargs) -> Plan:
+        """Compute the file operations of an action without touching the disk
+
+        Args:
+            action (str): method name (``initialize``, ``enable``, ``activate``...)
+            **kwargs: Parameters of the action
+
+        Returns:
+            Plan to be reviewed and applied
+        """
+        with Plan() as plan:
+            getattr(self, action)(**kwargs)
+        return plan
+
+    def get_commands(self, action: str, module_dir: str = os.path.sep.join(["iac", "modules"])) -> list:
+        """Get external commands of an action, run in order by a command runner while modules run concurrently
+
+        ``validate`` initializes the module without backend (providers are downloaded, so it needs network access or
+        a provider cache) before running ``terraform validate``. Subclasses could extend it to queue the commands of
+        ``compile`` or ``clean``.
+
+        Args:
+            action (str): ``validate``, ``compile`` or ``clean``
+            module_dir (str): Target Terraform Module Directory
+
+        Returns:
+            list of commands, each command is a list of arguments
         """
-        self.copy_dir(self.init_dir, ".", overwrite=False, git_add=True)
-        template_params = copy.deepcopy(kwargs)
-        cicd_params = template_params.pop("cicd", {})
-        config_params = template_params.pop("config", {})
-        self._build_template(**template_params)
-        self._build_cicd(**cicd_params)
-        self._build_config(**config_params)
-
-    def compile(self):
+        target_module_dir = os.path.sep.join([module_dir, self.module_name])
+        if action == "validate" and os.path.exists(target_module_dir):
+            return [
+                ["terraform", "fmt", "-check", "-recursive", target_module_dir],
+                ["terraform", f"-chdir={target_module_dir}", "init", "-backend=false", "-input=false", "-no-color"],
+                ["terraform", f"-chdir={target_module_dir}", "validate", "-no-color"],
+            ]
+        return []
+
+    def validate(self, runner: CommandRunner = None, **kwargs) -> list:
+        """Validate Terraform code of a module
+
+        Args:
+            runner (CommandRunner): command runner, a new one is created if not provided
+            **kwargs: Parameters of ``get_commands``
+
+        Returns:
+            list of command results, commands after a failure are not run
+        """
+        runner = runner or CommandRunner()
+        results = asyncio.run(runner.sequence(self.get_commands("validate", **kwargs)))
+        for result in results:
+            if not result.ok:
+                print(f"Validation failed-{self.module_name}: {' '.join(result.command)}")
+        return results
+
+    def compile(self, shard_dir: str = "", shard_count: int = 16, **kwargs):
         """Compile a module to prepare terraform apply
+
+        The source configuration of the module is split into shards so that Terraform could plan them in parallel,
+        unchanged shards are not rewritten. ``templates/module/examples/sharded.tf.example`` shows a base file
+        creating one module instance per shard.
+
+        Args:
+            shard_dir (str): Target directory of shard files, default to ``./.xia/shards/<module_name>``
+            shard_count (int): Number of shards
         """
+        config_file, config_dir = self.get_config_file_path()
+        config_file = config_file if config_file and os.path.isfile(config_file) else None
+        config_dir = config_dir if config_dir and os.path.isdir(config_dir) else None
+        if config_file is None and config_dir is None:
+            print(f"No source configuration found-{self.module_name}, skip")
+            return None
+        shard_dir = shard_dir or os.path.sep.join([".", ".xia", "shards", self.module_name])
+        with tracer.span("compile", module=self.module_name):
+            result = ConfigSharder(shard_dir, shard_count).compile(source_file=config_file, source_dir=config_dir)
+        print(f"Compiled {self.module_name}: {len(result.written)} shards written, "
+              f"{len(result.unchanged)} unchanged")
+        return result
 
     def clean(self):
         """Clean Task after terraform apply
@@ -0,0 +1,293 @@
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from xia_module.runner import CommandRunner
+from xia_module.staging import GitStaging
+from xia_module.plan import Plan
+
+
+class ModuleOrchestrator:
+    """Run module lifecycle actions following module dependencies
+
+    Modules without dependency between each other are executed concurrently on a bounded thread pool.
+    """
+    action_depends = {
+        "enable": "activate_depends",
+        "activate": "activate_depends",
+        "initialize": "activate_depends",
+        "compile": "deploy_depends",
+        "_build_cicd_actions": "deploy_depends",
+        "clean": "deploy_depends",
+        "validate": "deploy_depends",
+    }
+
+    def __init__(self, modules, max_workers: int = 4):
+        """Module orchestrator
+
+        Args:
+            modules: Module classes to be orchestrated
+            max_workers (int): Maximum modules running at the same time
+        """
+        self.modules = {module_class.module_name: module_class for module_class in modules}
+        self.max_workers = max_workers
+        self.timings = {}
+
+    @classmethod
+    def from_package(cls, package, **kwargs):
+        """Create an orchestrator from the ``modules`` dictionary of a package
+
+        Args:
+            package: imported package having a ``modules`` dictionary (module name -> class name)
+            **kwargs: Parameters of orchestrator
+
+        Returns:
+            Module orchestrator
+        """
+        return cls([getattr(package, class_name) for class_name in package.modules.values()], **kwargs)
+
+    def get_dependencies(self, depends_on: str = "activate_depends") -> dict:
+        """Get dependency graph of the orchestrated modules
+
+        Args:
+            depends_on (str): dependency attribute name (``activate_depends`` or ``deploy_depends``)
+
+        Returns:
+            Dictionary of module name -> set of module names it depends on. Modules outside of the orchestrator
+            are considered as already satisfied.
+        """
+        return {
+            module_name: {dep for dep in getattr(module_class, depends_on, []) if dep in self.modules}
+            for module_name, module_class in self.modules.items()
+        }
+
+    @classmethod
+    def _find_cycle(cls, dependencies: dict, remaining: set) -> list:
+        path, visited = [], set()
+
+        def visit(module_name):
+            if module_name in path:
+                return path[path.index(module_name):] + [module_name]
+            if module_name in visited:
+                return []
+            visited.add(module_name)
+            path.append(module_name)
+            for dep in sorted(dependencies[module_name] & remaining):
+                cycle = visit(dep)
+                if cycle:
+                    return cycle
+            path.pop()
+            return []
+
+        for module_name in sorted(remaining):
+            cycle = visit(module_name)
+            if cycle:
+                return cycle
+        return sorted(remaining)
+
+    def get_levels(self, depends_on: str = "activate_depends") -> list:
+        """Group modules into levels, modules of a level only depend on modules of previous levels
+
+        Args:
+            depends_on (str): dependency attribute name
+
+        Returns:
+            List of sorted module name list
+        """
+        dependencies = self.get_dependencies(depends_on)
+        levels, done, remaining = [], set(), set(dependencies)
+        while remaining:
+            level = sorted(name for name in remaining if dependencies[name] <= done)
+            if not level:
+                cycle = self._find_cycle(dependencies, remaining)
+                raise ValueError(f"Circular dependency found between modules: {' -> '.join(cycle)}")
+            levels.append(level)
+            done.update(level)
+            remaining.difference_update(level)
+        return levels
+
+    def get_order(self, depends_on: str = "activate_depends") -> list:
+        """Get modules classes in dependency order
+
+        Args:
+            depends_on (str): dependency attribute name
+
+        Returns:
+            List of module classes
+        """
+        return [self.modules[name] for level in self.get_levels(depends_on) for name in level]
+
+    def _run_module(self, module_name: str, action: str, init_kwargs: dict, kwargs: dict, staging: GitStaging,
+                    plan: Plan = None):
+        start_time = time.perf_counter()
+        with staging.bind(), plan.bind() if plan is not None else contextlib.nullcontext():
+            module_instance = self.modules[module_name](**init_kwargs)
+            getattr(module_instance, action)(**kwargs)
+        return time.perf_counter() - start_time
+
+    def run(self, action: str, depends_on: str = None, init_kwargs: dict = None, **kwargs) -> dict:
+        """Run an action of all modules
+
+        Args:
+            action (str): method name of the module (``enable``, ``activate``, ``initialize``...)
+            depends_on (str): dependency attribute name, default value is guessed from action
+            init_kwargs (dict): Parameters to create module instances
+            **kwargs: Parameters of the action
+
+        Returns:
+            Dictionary of module name -> duration in seconds
+
+        Modules are not scheduled anymore after a failure, the first error is raised once running modules are
+        finished. Files written by the modules already run, including the failed one, are still staged.
+        ``initialize`` assembles the environment workflows of all initialized modules once at the end instead of once
+        per module.
+        """
+        depends_on = depends_on or self.action_depends.get(action, "activate_depends")
+        init_kwargs = init_kwargs or {}
+        self.get_levels(depends_on)  # Circular dependency check before doing anything
+        dependencies = self.get_dependencies(depends_on)
+        dependents = {module_name: set() for module_name in dependencies}
+        for module_name, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].add(module_name)
+        waiting = {module_name: len(deps) for module_name, deps in dependencies.items()}
+        timings, error = {}, None
+        plan = Plan.current()  # Bound in worker threads
+        action_kwargs = {**kwargs, "build_workflows": False} if action == "initialize" else kwargs
+        with GitStaging() as staging:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                running = {}
+                ready = sorted(name for name, count in waiting.items() if count == 0)
+                while ready or running:
+                    for module_name in ready:
+                        future = executor.submit(self._run_module, module_name, action, init_kwargs, action_kwargs,
+                                                 staging, plan)
+                        running[future] = module_name
+                    ready = []
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        module_name = running.pop(future)
+                        if future.exception() is not None:
+                            error = error or future.exception()
+                            print(f"Module {module_name} failed to {action}: {future.exception()}")
+                            continue
+                        timings[module_name] = future.result()
+                        print(f"Module {module_name} {action} finished in {timings[module_name]:.3f}s")
+                        if error is not None:
+                            continue  # Stop scheduling new modules after an error
+                        for dependent in sorted(dependents[module_name]):
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0:
+                                ready.append(dependent)
+            if action == "initialize" and timings:
+                # Workflows of all initialized modules are loaded and written once
+                module_instances = [module_class(**init_kwargs) for module_class in self.get_order(depends_on)
+                                    if module_class.module_name in timings]
+                module_instances[0].build_cicd_workflows(module_instances)
+        # Raised once the staging session is closed, files of the modules already run are still staged
+        self.timings.update(timings)
+        if error is not None:
+            raise error
+        return timings
+
+    def _materialize_module(self, module_name: str, activate: bool, init_kwargs: dict, kwargs: dict,
+                            plan: Plan = None):
+        start_time = time.perf_counter()
+        with plan.bind() if plan is not None else contextlib.nullcontext():
+            module_instance = self.modules[module_name](**init_kwargs)
+            module_instance.enable(**kwargs)
+            if activate:
+                module_instance.activate(**kwargs)
+        return time.perf_counter() - start_time
+
+    def materialize(self, activate: bool = True, strategy: str = "copy", init_kwargs: dict = None, **kwargs) -> dict:
+        """Materialize Terraform templates (module, activate and base) of all modules concurrently
+
+        Only files are copied, so modules don't wait for their dependencies. Local modules and base files already
+        present in the foundation are kept.
+
+        Args:
+            activate (bool): Also materialize activate templates
+            strategy (str): ``copy``, ``hardlink`` or ``reflink`` from the installed packages
+            init_kwargs (dict): Parameters to create module instances
+            **kwargs: Parameters of enable / activate (module_dir, base_dir)
+
+        Returns:
+            Dictionary of module name -> duration in seconds
+        """
+        init_kwargs = init_kwargs or {}
+        kwargs["strategy"] = strategy
+        plan = Plan.current()
+        for target_dir in [kwargs.get("module_dir", os.path.join("iac", "modules")),
+                           kwargs.get("base_dir", os.path.join("iac", "environments", "base"))]:
+            if plan is None:
+                os.makedirs(target_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {module_name: executor.submit(self._materialize_module, module_name, activate, init_kwargs,
+                                                    kwargs, plan)
+                       for module_name in sorted(self.modules)}
+            timings = {module_name: future.result() for module_name, future in futures.items()}
+        self.timings.update(timings)
+        return timings
+
+    def build_cicd(self, init_kwargs: dict = None, landscape_config: dict = None) -> dict:
+        """Build CI/CD files of all modules, workflows are assembled in a single pass
+
+        Args:
+            init_kwargs (dict): Parameters to create module instances
+            landscape_config (dict): landscape configuration, loaded from ``config/landscape.yaml`` if not provided
+
+        Returns:
+            Dictionary of module name -> duration in seconds of action files copy
+        """
+        init_kwargs = init_kwargs or {}
+        with GitStaging():
+            timings = self.run("_build_cicd_actions", init_kwargs=init_kwargs)
+            module_instances = [module_class(**init_kwargs) for module_class in self.get_order("deploy_depends")]
+            if module_instances:
+                module_instances[0].build_cicd_workflows(module_instances, landscape_config)
+        return timings
+
+    def run_commands(self, action: str = "validate", max_concurrency: int = 4, timeout: float = None,
+                     init_kwargs: dict = None, **kwargs) -> dict:
+        """Run external commands of all modules together on a single event loop
+
+        Commands of a module are run in order and stop at the first failure, modules are run concurrently
+
+        Args:
+            action (str): action name passed to ``get_commands`` of modules (``validate``, ``compile``...)
+            max_concurrency (int): Maximum commands running at the same time
+            timeout (float): Timeout in seconds of each command
+            init_kwargs (dict): Parameters to create module instances
+            **kwargs: Parameters of ``get_commands``
+
+        Returns:
+            Dictionary of module name -> list of command results
+        """
+        init_kwargs = init_kwargs or {}
+        runner = CommandRunner(max_concurrency=max_concurrency, timeout=timeout)
+        depends_on = self.action_depends.get(action, "deploy_depends")
+        commands = {module_class.module_name: module_class(**init_kwargs).get_commands(action, **kwargs)
+                    for module_class in self.get_order(depends_on)}
+
+        async def run_all():
+            return await asyncio.gather(*[runner.sequence(module_commands) for module_commands in commands.values()])
+
+        return dict(zip(commands, asyncio.run(run_all())))
+
+    def plan(self, action: str, depends_on: str = None, init_kwargs: dict = None, **kwargs) -> Plan:
+        """Compute the file operations of an action of all modules without touching the disk
+
+        Args:
+            action (str): method name of the module (``enable``, ``activate``, ``initialize``...)
+            depends_on (str): dependency attribute name, default value is guessed from action
+            init_kwargs (dict): Parameters to create module instances
+            **kwargs: Parameters of the action
+
+        Returns:
+            Plan to be reviewed and applied
+        """
+        with Plan() as plan:
+            self.run(action, depends_on=depends_on, init_kwargs=init_kwargs, **kwargs)
+        return plan
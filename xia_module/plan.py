@@ -0,0 +1,297 @@
+import contextlib
+import difflib
+import os
+import threading
+from xia_module.copier import copy_file
+from xia_module.staging import GitStaging
+
+
+class PlanOperation:
+    """A planned file operation
+
+    Attributes:
+        action (str): ``copy``, ``skip``, ``unchanged``, ``render``, ``write`` or ``stage``
+        target (str): target file path
+        source (str): source file path of ``copy`` operation
+        diff (str): unified diff of the target file
+    """
+    def __init__(self, action: str, target: str, source: str = "", diff: str = ""):
+        self.action = action
+        self.target = target
+        self.source = source
+        self.diff = diff
+
+    def __repr__(self):
+        return f"PlanOperation({self.action}, {self.target})"
+
+
+class Plan:
+    """In-memory plan of file operations, to be reviewed then applied
+
+    While a plan is active, module operations of the same thread read from and write to the plan instead of the
+    disk. Worker threads use the plan of their owner through ``bind``.
+
+    Example:
+        >>> with Plan() as plan:
+        ...     Module().initialize()
+        >>> print(plan.diff())
+        >>> plan.apply()
+    """
+    _local = threading.local()  # Active plans of each thread, the last one is the current plan
+
+    def __init__(self):
+        self.operations = []
+        self._files = {}  # Normalized target path -> ("content", text) or ("copy", source file, strategy)
+        self._targets = {}  # Normalized target path -> target path as given
+        self._stages = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _get_plans(cls) -> list:
+        if not hasattr(cls._local, "plans"):
+            cls._local.plans = []
+        return cls._local.plans
+
+    @classmethod
+    def current(cls):
+        """Get the current active plan of this thread
+
+        Returns:
+            Current plan or None if no plan is active
+        """
+        plans = cls._get_plans()
+        return plans[-1] if plans else None
+
+    @contextlib.contextmanager
+    def bind(self):
+        """Make a plan current in this thread, typically a worker thread of the plan owner
+
+        Example:
+            >>> def worker(plan):
+            ...     with plan.bind():
+            ...         Module.copy_dir("source", "target")
+            >>> with Plan() as plan:
+            ...     executor.submit(worker, plan).result()
+        """
+        plans = self._get_plans()
+        plans.append(self)
+        try:
+            yield self
+        finally:
+            plans.remove(self)
+
+    def __enter__(self):
+        self._get_plans().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._get_plans().remove(self)
+
+    @classmethod
+    def _read_file(cls, filename: str) -> str:
+        try:
+            with open(filename) as fp:
+                return fp.read()
+        except UnicodeDecodeError:
+            return None
+
+    def exists(self, filename: str) -> bool:
+        with self._lock:
+            if os.path.normpath(filename) in self._files:
+                return True
+        return os.path.exists(filename)
+
+    def read_text(self, filename: str) -> str:
+        """Read a file as it will be after applying the plan
+
+        Args:
+            filename (str): file path
+
+        Returns:
+            file content, None for binary files
+        """
+        with self._lock:
+            entry = self._files.get(os.path.normpath(filename))
+        if entry is None:
+            return self._read_file(filename)
+        return entry[1] if entry[0] == "content" else self._read_file(entry[1])
+
+    def _get_diff(self, target: str, new_content) -> str:
+        old_content = self.read_text(target) if self.exists(target) else ""
+        if old_content is None or new_content is None:
+            return f"Binary files {target} differ\n"
+        return "".join(difflib.unified_diff(old_content.splitlines(keepends=True),
+                                            new_content.splitlines(keepends=True),
+                                            fromfile=f"a/{os.path.normpath(target)}", tofile=f"b/{os.path.normpath(target)}"))
+
+    def _add(self, operation: PlanOperation, entry: tuple = None):
+        with self._lock:
+            self.operations.append(operation)
+            if entry is not None:
+                self._files[os.path.normpath(operation.target)] = entry
+                self._targets[os.path.normpath(operation.target)] = operation.target
+
+    def copy(self, source_file: str, target_file: str, strategy: str = "copy"):
+        """Plan a file copy
+
+        Args:
+            source_file (str): source file path
+            target_file (str): target file path
+            strategy (str): copy strategy used when applying
+        """
+        diff = self._get_diff(target_file, self._read_file(source_file))
+        self._add(PlanOperation("copy", target_file, source_file, diff), ("copy", source_file, strategy))
+
+    def skip(self, target_file: str, action: str = "skip"):
+        """Record a file kept untouched
+
+        Args:
+            target_file (str): target file path
+            action (str): ``skip`` for existed file, ``unchanged`` for file with the same content
+        """
+        self._add(PlanOperation(action, target_file))
+
+    def write(self, target_file: str, content: str, action: str = "write") -> bool:
+        """Plan a file write, nothing is planned if the content is unchanged
+
+        Args:
+            target_file (str): target file path
+            content (str): new file content
+            action (str): ``write`` or ``render``
+
+        Returns:
+            True if the file will be changed
+        """
+        if self.exists(target_file) and self.read_text(target_file) == content:
+            self.skip(target_file, "unchanged")
+            return False
+        self._add(PlanOperation(action, target_file, diff=self._get_diff(target_file, content)), ("content", content))
+        return True
+
+    def stage(self, filename: str):
+        """Plan a Git staging
+
+        Args:
+            filename (str): file path
+        """
+        if not self.exists(filename):
+            raise ValueError(f"{filename} doesn't exist, cannot add to Git")
+        with self._lock:
+            if filename in self._stages:
+                return
+            self._stages.append(filename)
+        self._add(PlanOperation("stage", filename))
+
+    def summary(self) -> dict:
+        """Number of operations by action
+
+        Returns:
+            dictionary action -> count
+        """
+        counts = {}
+        for operation in self.operations:
+            counts[operation.action] = counts.get(operation.action, 0) + 1
+        return counts
+
+    def diff(self) -> str:
+        """Unified diff of all changed files
+
+        Returns:
+            diff of the final state of each changed file
+        """
+        with self._lock:
+            targets = dict(self._targets)
+        return "".join(self._get_final_diff(target) for target in targets.values())
+
+    def _get_final_diff(self, target: str) -> str:
+        old_content = self._read_file(target) if os.path.exists(target) else ""
+        new_content = self.read_text(target)
+        if old_content is None or new_content is None:
+            return f"Binary files {target} differ\n"
+        return "".join(difflib.unified_diff(old_content.splitlines(keepends=True),
+                                            new_content.splitlines(keepends=True),
+                                            fromfile=f"a/{os.path.normpath(target)}", tofile=f"b/{os.path.normpath(target)}"))
+
+    def apply(self):
+        """Apply the plan
+
+        All files are prepared as temporary files first, then renamed in place. Nothing is changed if a file cannot be
+        prepared. Planned files are staged in a single staging session.
+        """
+        with self._lock:
+            files = [(self._targets[key], entry) for key, entry in self._files.items()]
+            stages = list(self._stages)
+        prepared = []
+        try:
+            for target, entry in files:
+                os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                temp_file = f"{target}.xia-{os.getpid()}.tmp"
+                if entry[0] == "content":
+                    with open(temp_file, "w") as fp:
+                        fp.write(entry[1])
+                else:
+                    copy_file(entry[1], temp_file, entry[2])
+                prepared.append((temp_file, target))
+        except Exception:
+            for temp_file, _ in prepared:
+                os.remove(temp_file)
+            raise
+        for temp_file, target in prepared:
+            os.replace(temp_file, target)
+        if stages:
+            with GitStaging() as staging:
+                for filename in stages:
+                    staging.add(filename)
+
+
+def path_exists(filename: str) -> bool:
+    """Check if a file exists, taking the active plan into account
+
+    Args:
+        filename (str): file path
+
+    Returns:
+        True if file exists
+    """
+    plan = Plan.current()
+    return plan.exists(filename) if plan is not None else os.path.exists(filename)
+
+
+def read_text(filename: str) -> str:
+    """Read a file, taking the active plan into account
+
+    Args:
+        filename (str): file path
+
+    Returns:
+        file content
+    """
+    plan = Plan.current()
+    if plan is not None:
+        return plan.read_text(filename)
+    with open(filename) as fp:
+        return fp.read()
+
+
+def write_text(filename: str, content: str, action: str = "write") -> bool:
+    """Write a file if its content changes, into the active plan if any
+
+    Args:
+        filename (str): file path
+        content (str): file content
+        action (str): action name recorded in plan
+
+    Returns:
+        True if the file is (or will be) changed
+    """
+    plan = Plan.current()
+    if plan is not None:
+        return plan.write(filename, content, action)
+    if os.path.exists(filename):
+        with open(filename) as fp:
+            if fp.read() == content:
+                return False
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with open(filename, "w") as fp:
+        fp.write(content)
+    return True
@@ -0,0 +1,115 @@
+import hashlib
+import importlib
+import json
+import os
+from importlib import metadata
+from xia_module.cache import get_cache_dir
+
+ENTRY_POINT_GROUP = "xia.modules"
+
+
+class ModuleRegistry:
+    """Registry of modules provided by all installed packages
+
+    Packages are found by the ``xia.modules`` entry point group (``name = package``), or by the distribution name
+    prefix ``xia-`` for packages without entry point. Each package exposes a ``modules`` dictionary (module name ->
+    class name). The index is cached on disk and rebuilt when installed distributions change.
+    """
+    def __init__(self, cache_file: str = ""):
+        """Module registry
+
+        Args:
+            cache_file (str): index cache file, default to ``$XDG_CACHE_HOME/xia-module/registry.json``
+        """
+        self.cache_file = cache_file or os.path.join(get_cache_dir(), "registry.json")
+        self._index = None
+
+    @classmethod
+    def get_fingerprint(cls) -> str:
+        """Fingerprint of installed distribution versions
+
+        Returns:
+            hash of sorted distribution name and version
+        """
+        versions = sorted(f"{dist.metadata['Name']}=={dist.version}" for dist in metadata.distributions())
+        return hashlib.sha256("\n".join(versions).encode()).hexdigest()
+
+    @classmethod
+    def _get_entry_points(cls) -> list:
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, "select"):
+            return list(entry_points.select(group=ENTRY_POINT_GROUP))
+        return list(entry_points.get(ENTRY_POINT_GROUP, []))  # pragma: no cover, python 3.9
+
+    @classmethod
+    def _get_packages(cls) -> dict:
+        packages = {entry_point.value: entry_point.name for entry_point in cls._get_entry_points()}
+        for dist in metadata.distributions():
+            dist_name = dist.metadata["Name"] or ""
+            if dist_name.lower().startswith("xia-"):
+                package_name = dist_name.lower().replace("-", "_")
+                packages.setdefault(package_name, dist_name)
+        return packages
+
+    @classmethod
+    def discover(cls) -> dict:
+        """Discover modules of all installed packages
+
+        Returns:
+            dictionary of module name -> {"package": package name, "class": class name, "distribution": name}
+        """
+        index = {}
+        for package_name, dist_name in sorted(cls._get_packages().items()):
+            try:
+                package = importlib.import_module(package_name)
+            except ImportError:
+                print(f"Package {package_name} of {dist_name} cannot be imported, skip")
+                continue
+            for module_name, class_name in getattr(package, "modules", {}).items():
+                index[module_name] = {"package": package_name, "class": class_name, "distribution": dist_name}
+        return index
+
+    def get_index(self, refresh: bool = False) -> dict:
+        """Get module index, from disk cache if installed distributions didn't change
+
+        Args:
+            refresh (bool): Force discovery
+
+        Returns:
+            dictionary of module name -> {"package": package name, "class": class name, "distribution": name}
+        """
+        if self._index is not None and not refresh:
+            return self._index
+        fingerprint = self.get_fingerprint()
+        if not refresh and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file) as fp:
+                    cache_content = json.load(fp)
+                if cache_content.get("fingerprint") == fingerprint:
+                    self._index = cache_content["modules"]
+                    return self._index
+            except (ValueError, KeyError):
+                print(f"Module registry cache {self.cache_file} is corrupted, rebuild")
+        self._index = self.discover()
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, "w") as fp:
+                json.dump({"fingerprint": fingerprint, "modules": self._index}, fp, indent=2, sort_keys=True)
+        except OSError:
+            print(f"Module registry cache {self.cache_file} cannot be written, skip")
+        return self._index
+
+    def get_module_class(self, module_name: str):
+        """Import and get the class of a module
+
+        Args:
+            module_name (str): module name
+
+        Returns:
+            Module class
+        """
+        index = self.get_index()
+        if module_name not in index:
+            raise ValueError(f"Module {module_name} is not found in installed packages")
+        package = importlib.import_module(index[module_name]["package"])
+        return getattr(package, index[module_name]["class"])
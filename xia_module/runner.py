@@ -0,0 +1,142 @@
+import asyncio
+import time
+from xia_module.tracing import tracer
+
+
+class CommandResult:
+    """Result of an external command
+
+    Attributes:
+        command (list): command and arguments
+        returncode (int): exit code, 127 if the command is not found, None if timed out
+        stdout (str): captured standard output
+        stderr (str): captured standard error
+        duration (float): duration in seconds
+        timed_out (bool): command was killed after timeout
+    """
+    def __init__(self, command: list, returncode, stdout: str = "", stderr: str = "", duration: float = 0.0,
+                 timed_out: bool = False):
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+
+    def __repr__(self):
+        return f"CommandResult({' '.join(self.command)}, returncode={self.returncode})"
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def check(self):
+        """Raise an error if the command failed
+
+        Returns:
+            The result itself
+        """
+        if self.timed_out:
+            raise TimeoutError(f"{' '.join(self.command)} timed out after {self.duration:.1f}s")
+        if self.returncode != 0:
+            raise RuntimeError(f"{' '.join(self.command)} failed with code {self.returncode}: {self.stderr.strip()}")
+        return self
+
+
+class CommandRunner:
+    """Asyncio runner of external commands with a concurrency limit
+
+    Example:
+        >>> runner = CommandRunner(max_concurrency=4)
+        >>> results = runner.run_all([["terraform", "fmt", "-check"], ["git", "status"]])
+    """
+    def __init__(self, max_concurrency: int = 4, timeout: float = None):
+        """Command runner
+
+        Args:
+            max_concurrency (int): Maximum commands running at the same time
+            timeout (float): Default timeout in seconds of each command
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphores = {}  # Semaphore by event loop
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_concurrency)}
+        return self._semaphores[loop]
+
+    async def run(self, command: list, timeout: float = None, cwd: str = None, input_data: bytes = None):
+        """Run a command
+
+        Args:
+            command (list): command and arguments
+            timeout (float): timeout in seconds, default to the runner timeout
+            cwd (str): working directory
+            input_data (bytes): data sent to standard input
+
+        Returns:
+            Command result
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self._get_semaphore():
+            start_time = time.perf_counter()
+            with tracer.span("command", category="subprocess", command=" ".join(command)):
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *command, cwd=cwd, stdin=asyncio.subprocess.PIPE if input_data is not None else None,
+                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+                except FileNotFoundError as e:
+                    return CommandResult(command, 127, stderr=str(e), duration=time.perf_counter() - start_time)
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(input_data), timeout)
+                    timed_out = False
+                except asyncio.TimeoutError:
+                    process.kill()
+                    stdout, stderr = await process.communicate()
+                    timed_out = True
+        return CommandResult(command, None if timed_out else process.returncode,
+                             stdout.decode(errors="replace"), stderr.decode(errors="replace"),
+                             time.perf_counter() - start_time, timed_out)
+
+    async def gather(self, commands: list, **kwargs) -> list:
+        """Run commands concurrently
+
+        Args:
+            commands (list): list of commands
+            **kwargs: parameters of ``run``
+
+        Returns:
+            list of command results in the same order
+        """
+        return list(await asyncio.gather(*[self.run(command, **kwargs) for command in commands]))
+
+    async def sequence(self, commands: list, **kwargs) -> list:
+        """Run commands one after another, stop at the first failure
+
+        Args:
+            commands (list): list of commands
+            **kwargs: parameters of ``run``
+
+        Returns:
+            list of command results, commands after a failure are not run
+        """
+        results = []
+        for command in commands:
+            results.append(await self.run(command, **kwargs))
+            if not results[-1].ok:
+                break
+        return results
+
+    def run_all(self, commands: list, **kwargs) -> list:
+        """Run commands concurrently from synchronous code
+
+        Args:
+            commands (list): list of commands
+            **kwargs: parameters of ``run``
+
+        Returns:
+            list of command results in the same order
+        """
+        return asyncio.run(self.gather(commands, **kwargs))
@@ -0,0 +1,221 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import yaml
+from xia_module.plan import Plan, path_exists, read_text, write_text
+from xia_module.tracing import tracer
+from xia_module.yaml_backend import get_backend
+
+
+class ShardResult:
+    """Result of a configuration split
+
+    Attributes:
+        written (list): shard files written
+        unchanged (list): shard files kept because their content didn't change
+        removed (list): obsolete shard files removed
+    """
+    def __init__(self):
+        self.written = []
+        self.unchanged = []
+        self.removed = []
+
+    def __repr__(self):
+        return (f"ShardResult(written={len(self.written)}, unchanged={len(self.unchanged)}, "
+                f"removed={len(self.removed)})")
+
+
+class ConfigSharder:
+    """Split a module source configuration into deterministic shards
+
+    Each top-level key goes to the shard given by its hash, so adding or changing a key only rewrites one shard.
+    Source files are parsed item by item and each item is appended to its shard file as soon as it is read, so the
+    memory used doesn't depend on the configuration size. Item by item parsing is only provided by the pure python
+    loader, about 3 times slower than libyaml, so files smaller than ``stream_threshold`` bytes are loaded at once
+    with the C loader instead: their memory is bounded by the threshold. A manifest keeps the hash of each shard so
+    that unchanged shards are skipped by later compiles and could be skipped by Terraform plans too.
+
+    Example:
+        >>> ConfigSharder("./.xia/shards/my-module").compile(source_dir="./config/my-module")
+    """
+    manifest_name = "manifest.json"
+    file_extensions = (".yaml", ".yml")
+    stream_threshold = 16 << 20  # Files from this size are parsed item by item
+
+    def __init__(self, shard_dir: str, shard_count: int = 16):
+        """Configuration sharder
+
+        Args:
+            shard_dir (str): Target directory of shard files
+            shard_count (int): Number of shards, changing it moves keys between shards
+        """
+        if shard_count < 1:
+            raise ValueError("Shard count must be at least 1")
+        self.shard_dir = shard_dir
+        self.shard_count = shard_count
+        self.backend = get_backend("fast")
+
+    @classmethod
+    def get_shard_index(cls, key: str, shard_count: int) -> int:
+        """Get the shard of a key, stable across runs and python processes
+
+        Args:
+            key (str): top-level key of the configuration
+            shard_count (int): number of shards
+
+        Returns:
+            shard index
+        """
+        return int(hashlib.sha256(str(key).encode()).hexdigest()[:8], 16) % shard_count
+
+    def get_shard_file(self, index: int) -> str:
+        return os.path.join(self.shard_dir, f"shard-{index:0{len(str(self.shard_count - 1))}d}.yaml")
+
+    @classmethod
+    def get_source_files(cls, source_file: str = None, source_dir: str = None) -> list:
+        source_files = [source_file] if source_file else []
+        if source_dir:
+            for root, dirs, files in os.walk(source_dir):
+                dirs.sort()
+                source_files.extend(os.path.join(root, file_name) for file_name in sorted(files)
+                                    if file_name.endswith(cls.file_extensions))
+        return source_files
+
+    @classmethod
+    def iter_file_items(cls, file_name: str, stream_threshold: int = None):
+        """Iterate top-level items of a YAML file, large files are parsed without loading the whole document
+
+        Args:
+            file_name (str): YAML file containing a mapping
+            stream_threshold (int): size from which the file is parsed item by item, default to ``stream_threshold``
+
+        Yields:
+            key, value of each top-level item
+        """
+        stream_threshold = cls.stream_threshold if stream_threshold is None else stream_threshold
+        if os.path.getsize(file_name) < stream_threshold:
+            with open(file_name) as fp:
+                data = get_backend("fast").load(fp)
+            if data is None:
+                return  # Empty file
+            if not isinstance(data, dict):
+                raise ValueError(f"{file_name} must be a mapping of resources")
+            yield from data.items()
+            return
+        with open(file_name) as fp:
+            # Composer API is only provided by the pure python loader
+            loader = yaml.SafeLoader(fp)
+            try:
+                loader.get_event()  # Stream start
+                if loader.check_event(yaml.StreamEndEvent):
+                    return  # Empty file
+                loader.get_event()  # Document start
+                if loader.check_event(yaml.ScalarEvent) and loader.peek_event().value in ("", "~", "null"):
+                    return  # Empty document
+                if not loader.check_event(yaml.MappingStartEvent):
+                    raise ValueError(f"{file_name} must be a mapping of resources")
+                loader.get_event()
+                while not loader.check_event(yaml.MappingEndEvent):
+                    key = loader.construct_object(loader.compose_node(None, None), deep=True)
+                    value = loader.construct_object(loader.compose_node(None, None), deep=True)
+                    loader.constructed_objects, loader.recursive_objects = {}, {}
+                    yield key, value
+                loader.get_event()  # Mapping end
+                loader.get_event()  # Document end
+                if not loader.check_event(yaml.StreamEndEvent):
+                    raise ValueError(f"{file_name} must contain a single document")
+            finally:
+                loader.dispose()
+
+    def iter_items(self, source_file: str = None, source_dir: str = None):
+        """Iterate top-level items of the source configuration
+
+        Args:
+            source_file (str): source configuration file
+            source_dir (str): source configuration directory
+
+        Yields:
+            key, value of each top-level item
+        """
+        seen = {}
+        for file_name in self.get_source_files(source_file, source_dir):
+            for key, value in self.iter_file_items(file_name):
+                if key in seen:
+                    raise ValueError(f"Key {key} is defined in both {seen[key]} and {file_name}")
+                seen[key] = file_name
+                yield key, value
+
+    def load_manifest(self) -> dict:
+        manifest_file = os.path.join(self.shard_dir, self.manifest_name)
+        if not path_exists(manifest_file):
+            return {}
+        return json.loads(read_text(manifest_file))
+
+    def _write_shards(self, source_file: str, source_dir: str, work_dir: str) -> dict:
+        """Append each item to its shard file in the work directory
+
+        Returns:
+            Dictionary of shard index -> {"hash", "keys"}
+        """
+        fps, digests, keys = {}, {}, {}
+        try:
+            for key, value in self.iter_items(source_file, source_dir):
+                index = self.get_shard_index(key, self.shard_count)
+                if index not in fps:
+                    fps[index] = open(os.path.join(work_dir, f"{index}.yaml"), "w")
+                    digests[index], keys[index] = hashlib.sha256(), 0
+                stream = io.StringIO()
+                self.backend.dump({key: value}, stream, sort_keys=True, default_flow_style=False)
+                fps[index].write(stream.getvalue())
+                digests[index].update(stream.getvalue().encode())
+                keys[index] += 1
+        finally:
+            for fp in fps.values():
+                fp.close()
+        return {index: {"hash": digests[index].hexdigest(), "keys": keys[index]} for index in fps}
+
+    def compile(self, source_file: str = None, source_dir: str = None) -> ShardResult:
+        """Write shard files and manifest of the source configuration
+
+        Args:
+            source_file (str): source configuration file
+            source_dir (str): source configuration directory
+
+        Returns:
+            Result of the split
+        """
+        result = ShardResult()
+        plan = Plan.current()
+        if plan is None:
+            os.makedirs(self.shard_dir, exist_ok=True)
+        with tracer.span("compile_shards", category="compile", shard_dir=self.shard_dir), \
+                tempfile.TemporaryDirectory(dir=None if plan is not None else self.shard_dir) as work_dir:
+            old_shards = self.load_manifest().get("shards", {})
+            new_shards = {}
+            for index, entry in sorted(self._write_shards(source_file, source_dir, work_dir).items()):
+                shard_file = self.get_shard_file(index)
+                shard_name = os.path.basename(shard_file)
+                new_shards[shard_name] = entry
+                work_file = os.path.join(work_dir, f"{index}.yaml")
+                if old_shards.get(shard_name, {}).get("hash") == entry["hash"] and path_exists(shard_file):
+                    result.unchanged.append(shard_file)
+                    continue
+                if plan is not None:
+                    with open(work_file) as fp:
+                        plan.write(shard_file, fp.read())
+                else:
+                    os.replace(work_file, shard_file)
+                result.written.append(shard_file)
+            for shard_name in sorted(set(old_shards) - set(new_shards)):
+                shard_file = os.path.join(self.shard_dir, shard_name)
+                if path_exists(shard_file):
+                    if plan is None:
+                        os.remove(shard_file)
+                    result.removed.append(shard_file)
+            manifest = {"shard_count": self.shard_count, "shards": new_shards}
+            write_text(os.path.join(self.shard_dir, self.manifest_name), json.dumps(manifest, indent=2, sort_keys=True))
+            tracer.count("shards_written", len(result.written))
+            tracer.count("shards_unchanged", len(result.unchanged))
+        return result
@@ -0,0 +1,159 @@
+import contextlib
+import subprocess
+import threading
+import time
+from xia_module.runner import CommandRunner
+from xia_module.tracing import tracer
+
+
+class GitStaging:
+    """Staging session collecting files to be added to Git in batches
+
+    Paths registered during the session are flushed with ``git add --pathspec-from-file`` when the outermost
+    session exits, so that a whole ``initialize`` run forks a single ``git`` process instead of one per file.
+    The session is also flushed when it exits on an exception, so files written before the failure are staged.
+
+    Example:
+        >>> with GitStaging():
+        ...     Module.copy_dir("source", "target", git_add=True)
+    """
+    _local = threading.local()  # Active sessions of each thread, the last one is the current session
+
+    def __init__(self, batch_size: int = 0, verbose: bool = True):
+        """Staging session
+
+        Args:
+            batch_size (int): Maximum paths per ``git add`` call, 0 means all paths in one call
+            verbose (bool): Print timing of each batch
+        """
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.paths = []
+        self.batches = []  # Timing report of each flushed batch
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._parent = None
+        self._active = False
+
+    @classmethod
+    def _get_sessions(cls) -> list:
+        if not hasattr(cls._local, "sessions"):
+            cls._local.sessions = []
+        return cls._local.sessions
+
+    @classmethod
+    def current(cls):
+        """Get the current active staging session of this thread
+
+        Returns:
+            Current session or None if no session is active
+        """
+        sessions = cls._get_sessions()
+        return sessions[-1] if sessions else None
+
+    @contextlib.contextmanager
+    def bind(self):
+        """Make an active session current in this thread, typically a worker thread of the session owner
+
+        Example:
+            >>> def worker(staging):
+            ...     with staging.bind():
+            ...         Module.git_add("file.txt")
+            >>> with GitStaging() as staging:
+            ...     executor.submit(worker, staging).result()
+        """
+        sessions = self._get_sessions()
+        sessions.append(self)
+        try:
+            yield self
+        finally:
+            sessions.remove(self)
+
+    def add(self, filename: str):
+        """Register a file to be staged
+
+        Args:
+            filename (str): file path to be staged
+        """
+        with self._lock:
+            if filename not in self._seen:
+                self._seen.add(filename)
+                self.paths.append(filename)
+
+    def _take_batches(self) -> list:
+        """Take registered paths out of the session, split by batch size
+        """
+        with self._lock:
+            paths, self.paths, self._seen = self.paths, [], set()
+        batch_size = self.batch_size if self.batch_size > 0 else max(len(paths), 1)
+        return [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+
+    def flush(self) -> list:
+        """Add all registered paths to Git
+
+        Returns:
+            Timing report of each batch
+        """
+        reports = []
+        for batch in self._take_batches():
+            start_time = time.perf_counter()
+            with tracer.span("git_add", category="git", files=len(batch)):
+                subprocess.run(['git', 'add', '--pathspec-from-file=-', '--pathspec-file-nul'],
+                               input="\0".join(batch).encode(), check=True)
+            duration = time.perf_counter() - start_time
+            tracer.count("files_staged", len(batch))
+            reports.append({"files": len(batch), "duration": duration})
+            if self.verbose:
+                print(f"Staged {len(batch)} files in {duration:.3f}s")
+        self.batches.extend(reports)
+        return reports
+
+    async def flush_async(self, runner=None) -> list:
+        """Add all registered paths to Git from asynchronous code
+
+        Batches are run one after another because ``git add`` holds the index lock.
+
+        Args:
+            runner (CommandRunner): command runner, a new one is created if not provided
+
+        Returns:
+            Timing report of each batch
+        """
+        runner = runner or CommandRunner()
+        reports = []
+        for batch in self._take_batches():
+            result = await runner.run(['git', 'add', '--pathspec-from-file=-', '--pathspec-file-nul'],
+                                      input_data="\0".join(batch).encode())
+            result.check()
+            tracer.count("files_staged", len(batch))
+            reports.append({"files": len(batch), "duration": result.duration})
+            if self.verbose:
+                print(f"Staged {len(batch)} files in {result.duration:.3f}s")
+        self.batches.extend(reports)
+        return reports
+
+    def __enter__(self):
+        sessions = self._get_sessions()
+        self._parent = sessions[-1] if sessions else None
+        self._active = True
+        sessions.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._get_sessions().remove(self)
+        self._active = False
+        parent = self._parent
+        while parent is not None and not parent._active:
+            parent = parent._parent
+        if parent is not None:
+            # Nested session: the nearest active ancestor will do the real job
+            for path in self.paths:
+                parent.add(path)
+            self.paths, self._seen = [], set()
+        else:
+            # Files written before a failure are staged too, as they would be without a session
+            try:
+                self.flush()
+            except subprocess.CalledProcessError:
+                if exc_type is None:
+                    raise
@@ -0,0 +1,300 @@
+import os
+import re
+import threading
+
+
+class TerraformBlock:
+    """Block of a Terraform file
+
+    Attributes:
+        block_type (str): block type (``module``, ``resource``, ``variable``...)
+        labels (list): block labels
+        attributes (dict): attribute name -> value. Strings are unquoted, other expressions are kept as raw text
+        blocks (list): nested blocks
+        file (str): file name
+        line (int): line number of the block
+    """
+    def __init__(self, block_type: str, labels: list, file: str = "", line: int = 0):
+        self.block_type = block_type
+        self.labels = labels
+        self.attributes = {}
+        self.blocks = []
+        self.file = file
+        self.line = line
+
+    def __repr__(self):
+        return f"TerraformBlock({self.block_type}, {self.labels})"
+
+    def find_attribute(self, name: str):
+        """Find an attribute in the block or in nested blocks
+
+        Args:
+            name (str): attribute name
+
+        Returns:
+            attribute value or None if not found
+        """
+        if name in self.attributes:
+            return self.attributes[name]
+        for block in self.blocks:
+            value = block.find_attribute(name)
+            if value is not None:
+                return value
+        return None
+
+
+class HclParser:
+    """Parser of the HCL subset used by Terraform environment files
+
+    Blocks, attributes, strings with interpolations, heredocs and comments are supported. Attribute expressions are
+    not evaluated.
+    """
+    _simple_tokens = re.compile(r"""
+        (?P<comment>\#[^\n]*|//[^\n]*|/\*.*?\*/)
+        |(?P<heredoc><<-?(?P<tag>[A-Za-z_]\w*)[ \t]*\n.*?\n[ \t]*(?P=tag)[ \t]*(?=\n|$))
+        |(?P<newline>\n)
+        |(?P<space>[ \t\r]+)
+        |(?P<ident>[A-Za-z_][\w\-]*)
+        |(?P<open>[{\[(])
+        |(?P<close>[}\])])
+        |(?P<equal>=(?![=>]))
+        |(?P<other>.)
+    """, re.S | re.X)
+    _escapes = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+    @classmethod
+    def _scan_string(cls, content: str, start: int) -> int:
+        """Find the end of a quoted string, nested strings of interpolations included
+
+        Returns:
+            position after the closing quote
+        """
+        i, depth = start + 1, 0
+        while i < len(content):
+            char = content[i]
+            if char == "\\":
+                i += 2
+                continue
+            if depth == 0 and char == '"':
+                return i + 1
+            if content.startswith("${", i) or content.startswith("%{", i):
+                depth += 1
+                i += 2
+                continue
+            if depth > 0 and char == '"':
+                i = cls._scan_string(content, i)
+                continue
+            if depth > 0 and char == "}":
+                depth -= 1
+            i += 1
+        raise ValueError(f"Unterminated string at position {start}")
+
+    @classmethod
+    def tokenize(cls, content: str) -> list:
+        """Tokenize HCL content
+
+        Returns:
+            list of (kind, text, position)
+        """
+        tokens, i = [], 0
+        while i < len(content):
+            if content[i] == '"':
+                end = cls._scan_string(content, i)
+                tokens.append(("string", content[i:end], i))
+                i = end
+                continue
+            matched = cls._simple_tokens.match(content, i)
+            kind = matched.lastgroup if matched.lastgroup != "tag" else "heredoc"
+            if kind == "comment" and "\n" in matched.group(0):
+                tokens.append(("newline", "\n", i))
+            elif kind not in ("space", "comment"):
+                tokens.append((kind, matched.group(0), i))
+            i = matched.end()
+        return tokens
+
+    @classmethod
+    def _unquote(cls, text: str) -> str:
+        return re.sub(r"\\(.)", lambda m: cls._escapes.get(m.group(1), m.group(0)), text[1:-1])
+
+    @classmethod
+    def parse(cls, content: str, file: str = "") -> TerraformBlock:
+        """Parse HCL content
+
+        Args:
+            content (str): file content
+            file (str): file name
+
+        Returns:
+            Root block (type ``file``), top level blocks are in its ``blocks`` attribute
+        """
+        tokens = cls.tokenize(content)
+        root = TerraformBlock("file", [], file)
+        position = cls._parse_body(content, tokens, 0, root)
+        if position < len(tokens):
+            raise ValueError(f"Unexpected '{tokens[position][1]}' in {file}")
+        return root
+
+    @classmethod
+    def parse_attributes(cls, content: str, file: str = "") -> TerraformBlock:
+        """Line based fallback collecting ``name = value`` lines of content, first value wins
+
+        Args:
+            content (str): file content
+            file (str): file name
+
+        Returns:
+            Root block (type ``file``) holding all found attributes
+        """
+        root = TerraformBlock("file", [], file)
+        for name, value in re.findall(r"^[ \t]*([A-Za-z_][\w\-]*)[ \t]*=[ \t]*(.*?)[ \t]*$", content, re.M):
+            if value.startswith('"') and value.endswith('"') and len(value) > 1:
+                value = cls._unquote(value)
+            root.attributes.setdefault(name, value)
+        return root
+
+    @classmethod
+    def _parse_body(cls, content: str, tokens: list, i: int, block: TerraformBlock) -> int:
+        while i < len(tokens):
+            kind, text, position = tokens[i]
+            if kind == "newline":
+                i += 1
+            elif kind == "close" and text == "}":
+                return i
+            elif kind == "ident" and i + 1 < len(tokens) and tokens[i + 1][0] == "equal":
+                i = cls._parse_attribute(content, tokens, i + 2, block, text)
+            elif kind == "ident":
+                labels, j = [], i + 1
+                while j < len(tokens) and tokens[j][0] in ("string", "ident"):
+                    label = tokens[j][1]
+                    labels.append(cls._unquote(label) if tokens[j][0] == "string" else label)
+                    j += 1
+                if j >= len(tokens) or tokens[j][1] != "{":
+                    raise ValueError(f"Invalid block {text} in {block.file}")
+                line = content.count("\n", 0, position) + 1
+                child = TerraformBlock(text, labels, block.file, line)
+                j = cls._parse_body(content, tokens, j + 1, child)
+                if j >= len(tokens):
+                    raise ValueError(f"Unterminated block {text} in {block.file}")
+                block.blocks.append(child)
+                i = j + 1
+            else:
+                raise ValueError(f"Unexpected '{text}' in {block.file}")
+        return i
+
+    @classmethod
+    def _parse_attribute(cls, content: str, tokens: list, i: int, block: TerraformBlock, name: str) -> int:
+        start, depth, value_tokens = i, 0, []
+        while i < len(tokens):
+            kind, text, position = tokens[i]
+            if kind == "newline" and depth == 0:
+                break
+            if kind == "close" and depth == 0:  # Single line block: name = value }
+                break
+            if kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth -= 1
+            if kind != "newline":
+                value_tokens.append(tokens[i])
+            i += 1
+        if len(value_tokens) == 1 and value_tokens[0][0] == "string":
+            block.attributes[name] = cls._unquote(value_tokens[0][1])
+        elif value_tokens:
+            end_token = value_tokens[-1]
+            block.attributes[name] = content[tokens[start][2]:end_token[2] + len(end_token[1])].strip()
+        else:
+            block.attributes[name] = ""
+        return i
+
+
+class TerraformIndex:
+    """Index of blocks in a Terraform directory
+
+    Indexes are cached by directory and rebuilt when a ``.tf`` file is added, removed or modified.
+    """
+    _indexes = {}  # Directory absolute path -> (signature, index)
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.files = {}  # File name -> root block
+        self.modules = {}  # Module name -> module block
+
+    @classmethod
+    def _get_signature(cls, directory: str) -> tuple:
+        with os.scandir(directory) as entries:
+            return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                                for entry in entries if entry.name.endswith(".tf") and entry.is_file()))
+
+    @classmethod
+    def load(cls, directory: str):
+        """Get the index of a directory, parsed again only if files changed
+
+        Args:
+            directory (str): Terraform directory
+
+        Returns:
+            Terraform index
+        """
+        key = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            return cls(directory)
+        signature = cls._get_signature(directory)
+        with cls._indexes_lock:
+            cached = cls._indexes.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        index = cls(directory)
+        for file_name, _, _ in signature:
+            with open(os.path.join(directory, file_name)) as fp:
+                content = fp.read()
+            try:
+                root = HclParser.parse(content, file_name)
+            except ValueError as e:
+                print(f"{e}, only attributes of {file_name} are indexed")
+                root = HclParser.parse_attributes(content, file_name)
+            index.files[file_name] = root
+            for block in root.blocks:
+                if block.block_type == "module" and block.labels:
+                    index.modules[block.labels[0]] = block
+        with cls._indexes_lock:
+            cls._indexes[key] = (signature, index)
+        return index
+
+    def get_module(self, module_name: str):
+        """Get a module block
+
+        Args:
+            module_name (str): module block label
+
+        Returns:
+            module block or None if not found
+        """
+        return self.modules.get(module_name)
+
+    def get_module_dependencies(self, module_name: str) -> list:
+        """Get module names in ``depends_on`` of a module block
+
+        Args:
+            module_name (str): module block label
+
+        Returns:
+            list of module names
+        """
+        module_block = self.get_module(module_name)
+        if module_block is None:
+            return []
+        return re.findall(r"\bmodule\.([\w\-]+)", module_block.attributes.get("depends_on", ""))
+
+    def find_attribute(self, file_name: str, name: str):
+        """Find the first attribute of a file
+
+        Args:
+            file_name (str): file name in the directory
+            name (str): attribute name
+
+        Returns:
+            attribute value or None if not found
+        """
+        root = self.files.get(file_name)
+        return None if root is None else root.find_attribute(name)
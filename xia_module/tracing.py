@@ -0,0 +1,115 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_ENV_VAR = "XIA_TRACE"  # Trace file to be written at exit, tracing is disabled if not set
+
+
+class Tracer:
+    """Record spans and counters of module operations
+
+    Spans are recorded when tracing is enabled by ``XIA_TRACE`` environment variable or when hooks are registered.
+    Each hook is called with the event dictionary in Chrome trace format.
+
+    Example:
+        >>> tracer.add_hook(lambda event: print(event["name"], event.get("dur")))
+        >>> with tracer.span("copy_dir", module="xia-module"):
+        ...     pass
+    """
+    def __init__(self, trace_file: str = ""):
+        """Tracer
+
+        Args:
+            trace_file (str): Chrome trace file to be written by ``dump`` when no file name is given
+        """
+        self.trace_file = trace_file
+        self.events = []
+        self.counters = {}
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.trace_file or self.hooks)
+
+    def add_hook(self, hook):
+        """Register a callback receiving each finished span or counter event
+
+        Args:
+            hook: callable receiving an event dictionary
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _emit(self, event: dict):
+        with self._lock:
+            if self.trace_file:
+                self.events.append(event)
+        for hook in list(self.hooks):
+            hook(event)
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self._origin) * 1_000_000
+
+    @contextmanager
+    def span(self, name: str, category: str = "module", **kwargs):
+        """Record a span
+
+        Args:
+            name (str): span name (phase or operation)
+            category (str): span category
+            **kwargs: span arguments (module name, file path...)
+        """
+        if not self.enabled:
+            yield
+            return
+        start = self._now()
+        try:
+            yield
+        finally:
+            self._emit({"name": name, "cat": category, "ph": "X", "ts": start, "dur": self._now() - start,
+                        "pid": os.getpid(), "tid": threading.get_ident(), "args": kwargs})
+
+    def count(self, name: str, value: int = 1):
+        """Increase a counter
+
+        Args:
+            name (str): counter name (files_copied, files_staged...)
+            value (int): increment
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            total = self.counters[name]
+        self._emit({"name": name, "cat": "counter", "ph": "C", "ts": self._now(),
+                    "pid": os.getpid(), "tid": threading.get_ident(), "args": {name: total}})
+
+    def to_chrome_trace(self) -> dict:
+        with self._lock:
+            return {"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                    "otherData": {"counters": dict(self.counters)}}
+
+    def dump(self, filename: str = ""):
+        """Write recorded events as a Chrome trace file
+
+        Args:
+            filename (str): trace file, default to the tracer trace file
+        """
+        filename = filename or self.trace_file
+        if not filename:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, "w") as fp:
+            json.dump(self.to_chrome_trace(), fp)
+
+
+tracer = Tracer(os.environ.get(TRACE_ENV_VAR, ""))
+if tracer.trace_file:
+    atexit.register(tracer.dump)
@@ -0,0 +1,316 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from xia_module.staging import GitStaging
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class PollingWatcher:
+    """Detect file changes by comparing snapshots of mtime and size
+    """
+    def __init__(self, paths: list, interval: float = 1.0):
+        """Polling watcher
+
+        Args:
+            paths (list): directories (watched recursively) or files
+            interval (float): seconds between two snapshots
+        """
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> dict:
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isfile(path):
+                file_stat = os.stat(path)
+                snapshot[path] = (file_stat.st_mtime_ns, file_stat.st_size)
+            for root, dirs, files in os.walk(path):
+                for file_name in files:
+                    file_path = os.path.join(root, file_name)
+                    try:
+                        file_stat = os.stat(file_path)
+                    except OSError:
+                        continue
+                    snapshot[file_path] = (file_stat.st_mtime_ns, file_stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: float = None) -> set:
+        """Wait for changes
+
+        Args:
+            timeout (float): maximum seconds to wait, wait forever if None
+
+        Returns:
+            set of changed file paths, empty if timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.take_snapshot()
+            changes = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changes:
+                return changes
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic())))
+
+    def close(self):
+        """Nothing to release"""
+
+
+class InotifyWatcher:
+    """Detect file changes with Linux inotify, sub directories are watched recursively
+    """
+    def __init__(self, paths: list):
+        """Inotify watcher
+
+        Args:
+            paths (list): directories (watched recursively) or files
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # Watch descriptor -> directory
+        self.roots = set()  # Directories watched recursively
+        self.files = set()  # Watched single files
+        for path in paths:
+            if os.path.isdir(path):
+                self.roots.add(os.path.abspath(path))
+                self._add_tree(path)
+            elif os.path.isdir(os.path.dirname(path) or "."):
+                self.files.add(os.path.abspath(path))
+                self._add_watch(os.path.dirname(path) or ".")
+
+    def _add_watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed on {directory}")
+        self.watches[wd] = directory
+
+    def _add_tree(self, directory: str):
+        for root, dirs, files in os.walk(directory):
+            self._add_watch(root)
+
+    def _read_events(self) -> set:
+        changes = set()
+        try:
+            buffer = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changes
+        offset = 0
+        while offset + 16 <= len(buffer):
+            wd, mask, cookie, name_length = struct.unpack_from("iIII", buffer, offset)
+            name = buffer[offset + 16:offset + 16 + name_length].rstrip(b"\0").decode()
+            offset += 16 + name_length
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                    self._add_tree(path)
+                continue
+            if self._is_watched(path):
+                changes.add(path)
+        return changes
+
+    def _is_watched(self, path: str) -> bool:
+        abs_path = os.path.abspath(path)
+        return abs_path in self.files or any(abs_path.startswith(root + os.path.sep) for root in self.roots)
+
+    def wait(self, timeout: float = None) -> set:
+        """Wait for changes
+
+        Args:
+            timeout (float): maximum seconds to wait, wait forever if None
+
+        Returns:
+            set of changed file paths, empty if timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return set()
+            changes = self._read_events()
+            if changes:
+                return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ModuleWatcher:
+    """Watch module templates and landscape file, then rebuild the affected phases only
+
+    =================================== ==================================================
+    Changed file                        Rebuilt phase
+    =================================== ==================================================
+    ``templates/<module>/init``         copy of new init files
+    ``templates/<module>/template``     ``_build_template``
+    ``templates/<module>/config``       ``_build_config``
+    ``templates/<module>/cicd``         action files and workflows of the module
+    ``config/landscape.yaml``           workflows of added or modified environments
+    =================================== ==================================================
+
+    Workflows of modified environments get their trigger and stage jobs regenerated. A failed rebuild is reported
+    and the watcher keeps running.
+    """
+    landscape_file = os.path.join(".", "config", "landscape.yaml")
+
+    def __init__(self, modules: list, use_inotify: bool = True, interval: float = 0.5, debounce: float = 0.2,
+                 **kwargs):
+        """Module watcher
+
+        Args:
+            modules (list): module instances in dependency order
+            use_inotify (bool): Use inotify if available, polling otherwise
+            interval (float): polling interval in seconds
+            debounce (float): seconds to wait for more changes before rebuilding
+            **kwargs: initialize parameters (``cicd`` and ``config`` keys are used by their phases)
+        """
+        self.modules = modules
+        self.debounce = debounce
+        self.template_params = dict(kwargs)
+        self.cicd_params = self.template_params.pop("cicd", {})
+        self.config_params = self.template_params.pop("config", {})
+        self.landscape_config = modules[0].get_landscape_config() if modules else {}
+        paths = [path for module in modules for path in self.get_module_dirs(module).values()]
+        paths = [path for path in paths if os.path.isdir(path)] + [self.landscape_file]
+        self.watcher = None
+        if use_inotify:
+            try:
+                self.watcher = InotifyWatcher(paths)
+            except (OSError, AttributeError) as e:
+                print(f"inotify is not available ({e}), fallback to polling")
+        if self.watcher is None:
+            self.watcher = PollingWatcher(paths, interval)
+
+    @classmethod
+    def get_module_dirs(cls, module) -> dict:
+        return {"init": module.init_dir, "template": module.template_dir, "config": module.config_dir,
+                "cicd": module.cicd_dir}
+
+    def classify(self, changes: set) -> set:
+        """Find phases to be rebuilt
+
+        Args:
+            changes (set): changed file paths
+
+        Returns:
+            set of (module name, phase), module name is empty for landscape change
+        """
+        phases = set()
+        for path in changes:
+            abs_path = os.path.abspath(path)
+            if abs_path == os.path.abspath(self.landscape_file):
+                phases.add(("", "landscape"))
+                continue
+            for module in self.modules:
+                for phase, directory in self.get_module_dirs(module).items():
+                    if abs_path.startswith(os.path.abspath(directory) + os.path.sep):
+                        phases.add((module.module_name, phase))
+        return phases
+
+    def _get_changed_environments(self) -> dict:
+        new_landscape = self.modules[0].get_landscape_config()
+        old_landscape, self.landscape_config = self.landscape_config, new_landscape
+        if "environments" not in new_landscape or any(new_landscape.get(key) != old_landscape.get(key)
+                                                      for key in ("cicd", "git")):
+            return new_landscape  # Full rebuild
+        old_envs = old_landscape.get("environments", {})
+        changed_envs = {env_name: env_config for env_name, env_config in new_landscape["environments"].items()
+                        if old_envs.get(env_name) != env_config}
+        return {**new_landscape, "environments": changed_envs}
+
+    def rebuild(self, phases: set) -> dict:
+        """Rebuild phases, a failed phase is reported without stopping the others
+
+        Args:
+            phases (set): set of (module name, phase)
+
+        Returns:
+            Dictionary of (module name, phase) -> error of failed phases
+        """
+        modules = {module.module_name: module for module in self.modules}
+        errors = {}
+        with GitStaging():
+            if ("", "landscape") in phases:
+                old_landscape = self.landscape_config
+                try:
+                    landscape_config = self._get_changed_environments()
+                    if landscape_config.get("environments", True):
+                        print(f"Rebuild workflows of {', '.join(landscape_config.get('environments', ['base']))}")
+                        self.modules[0].build_cicd_workflows(self.modules, landscape_config, refresh=True)
+                except Exception as e:
+                    self.landscape_config = old_landscape  # Changed environments are retried at next change
+                    errors[("", "landscape")] = e
+                    print(f"Rebuild of landscape failed: {e}")
+            for module_name, phase in sorted(phases):
+                module = modules.get(module_name)
+                if module is None:
+                    continue
+                print(f"Rebuild {phase} of {module_name}")
+                try:
+                    if phase == "init":
+                        module.copy_dir(module.init_dir, ".", overwrite=False, git_add=True)
+                    elif phase == "template":
+                        template_errors = module._build_template(**self.template_params)
+                        if template_errors:
+                            raise ValueError(f"Templates failed to render: {', '.join(sorted(template_errors))}")
+                    elif phase == "config":
+                        module._build_config(**self.config_params)
+                    elif phase == "cicd":
+                        module._build_cicd_actions()
+                        # Steps owned by the module are updated in place, other steps are kept
+                        module.build_cicd_workflows([module], self.landscape_config, replace=True)
+                except Exception as e:
+                    errors[(module_name, phase)] = e
+                    print(f"Rebuild {phase} of {module_name} failed: {e}")
+        return errors
+
+    def run(self, max_rebuilds: int = None, timeout: float = None):
+        """Watch and rebuild until interrupted
+
+        Args:
+            max_rebuilds (int): stop after the given number of rebuilds
+            timeout (float): stop after waiting the given seconds without change
+        """
+        rebuilds = 0
+        try:
+            while max_rebuilds is None or rebuilds < max_rebuilds:
+                changes = self.watcher.wait(timeout)
+                if not changes:
+                    break
+                while True:  # Group changes of the same edit
+                    more_changes = self.watcher.wait(self.debounce)
+                    if not more_changes:
+                        break
+                    changes |= more_changes
+                phases = self.classify(changes)
+                if phases:
+                    self.rebuild(phases)
+                    rebuilds += 1
+        except KeyboardInterrupt:
+            print("Watch stopped")
+        finally:
+            self.watcher.close()
@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+import yaml
+from ruamel.yaml import YAML
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+    HAS_LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+    HAS_LIBYAML = False
+
+
+class YamlBackend(ABC):
+    """YAML backend interface
+    """
+    name = ""
+
+    @abstractmethod
+    def load(self, stream):
+        """Load YAML document
+
+        Args:
+            stream: string or opened file object
+
+        Returns:
+            Parsed data
+        """
+
+    @abstractmethod
+    def dump(self, data, stream, **kwargs):
+        """Dump data as YAML document
+
+        Args:
+            data: data to be dumped
+            stream: opened file object
+        """
+
+
+class FastBackend(YamlBackend):
+    """Read-only oriented backend using libyaml C loader / dumper when available, plain python objects
+    """
+    name = "fast"
+
+    def load(self, stream):
+        return yaml.load(stream, Loader=SafeLoader)
+
+    def dump(self, data, stream, **kwargs):
+        yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+
+
+class RoundTripBackend(YamlBackend):
+    """Backend keeping comments and format, for files to be rewritten
+    """
+    name = "roundtrip"
+
+    def load(self, stream):
+        return YAML().load(stream)
+
+    def dump(self, data, stream, **kwargs):
+        YAML().dump(data, stream)
+
+
+_backends = {backend.name: backend for backend in [FastBackend(), RoundTripBackend()]}
+
+
+def register_backend(backend: YamlBackend):
+    """Register a YAML backend
+
+    Args:
+        backend (YamlBackend): backend to be registered, replace the existed backend with the same name
+    """
+    _backends[backend.name] = backend
+
+
+def get_backend(name: str = "", readonly: bool = True) -> YamlBackend:
+    """Get a YAML backend
+
+    Args:
+        name (str): backend name
+        readonly (bool): If no name is given, ``fast`` for read-only files, ``roundtrip`` for files to be rewritten
+
+    Returns:
+        YAML backend
+    """
+    name = name or ("fast" if readonly else "roundtrip")
+    if name not in _backends:
+        raise ValueError(f"YAML backend {name} doesn't exist")
+    return _backends[name]